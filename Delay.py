@@ -1,13 +1,12 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import seaborn as sns
-from google.oauth2 import service_account
-from google.cloud import storage
-import io
+
+from analytics.cache import BUCKET_NAME, DATASETS
+from analytics.figures import delay_page_figures
+from analytics.report import MEDIAN_RENTAL, PENALTY, business_summary, exploration_summary
+from analytics.revenue import count_above, revenue_above, risk_above, risk_over_revenue_above
+from components import (page_metrics, raw_data_explorer, read_dataset, show_page_figure, show_profiling,
+                        start_profiling)
 
 pd.options.mode.chained_assignment = None  # default='warn'
 
@@ -30,6 +29,8 @@ st.sidebar.write("Dashboard made by [@Ukratic](https://github.com/Ukratic)")
 
 st.sidebar.success("Navigate to a page above")
 
+profiler = start_profiling('delay')
+
 st.header("Getaround data : Delay")
 st.markdown("""A few new columns have been added to make it easier to explore the data.
 - `checkout` : string value representing the delay (see values in graph below).
@@ -37,33 +38,25 @@ st.markdown("""A few new columns have been added to make it easier to explore th
 - `next_checkout_min_delay` : `delay_at_checkout_in_minutes` without outliers.
 """)
 
-# Google storage credentials
-credentials = service_account.Credentials.from_service_account_info(
-    st.secrets["gcp_service_account"]
-)
-client = storage.Client(credentials=credentials)
-
-# Uses st.experimental_memo to only rerun when the query changes or after 10 min.
-@st.experimental_memo(ttl=600)
-def read_file(bucket_name, file_path):
-    bucket = client.bucket(bucket_name)
-    content = bucket.blob(file_path).download_as_string().decode('utf-8')
-    return content
-
-bucket_name = "get_around_data"
-file_path = "delay_df.csv"
+profiler.mark('data load')
+# The storage client, dataset and aggregates are shared with the other page and the boot-time warm-up
+# (see analytics/cache.py), so a warmed up server only loads them from disk.
+bucket_name = BUCKET_NAME
+file_path, columns = DATASETS['delay']
 
 data_load_state = st.text('Loading data, please wait...')
-content = read_file(bucket_name, file_path)
-
-data = pd.read_csv(io.StringIO(content))
+data, version = read_dataset(bucket_name, file_path, columns)
+metrics = page_metrics('delay', version, data)
+page_figures = delay_page_figures(metrics)
 data_load_state.text("")
 
+profiler.mark('raw data')
 # Show raw data
 if st.checkbox('Show raw data'):
     st.subheader('Raw data')
-    st.write(data)
+    raw_data_explorer(data, ('checkin_type', 'state'))
 
+profiler.mark('exploration')
 # Data exploration
 st.subheader("Data exploration")
 
@@ -71,62 +64,37 @@ col1, col2= st.columns(2)
 
 with col1 :
 #plot 1    
-    checkout_clean = data.dropna(subset=['delay_at_checkout_in_minutes'])
-    checktype_checkout = checkout_clean.groupby(['checkin_type','checkout']).size().reset_index(name='count')
-    checktype_checkout['percentage'] = [i / checktype_checkout['count'].sum() * 100 for i in checktype_checkout['count']]
-
-    fig = plt.figure(figsize=(10,6))
-    sns.barplot(y=checktype_checkout['percentage'],x=checktype_checkout['checkin_type'], hue=checktype_checkout['checkout'],orient='vertical')
-    plt.title('Mobile and Connect rentals per checkout delay')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'checkout_shares', version)
 
 with col2 : 
-    has_next = data.groupby(['checkin_type','next_rental']).size().reset_index(name='count')
-    has_next['percentage'] = [i / has_next['count'].sum() * 100 for i in has_next['count']]
-
-    fig = plt.figure(figsize=(10,6))
-    sns.barplot(y=has_next['percentage'],x=has_next['checkin_type'], hue=has_next['next_rental'],orient='vertical')
-    plt.title('Next rental or not depending on checkin type')
-    st.pyplot(fig)
-
-med_delay = data['delays_checkout_min_cleaned'].median()
-mean_delay = data['delays_checkout_min_cleaned'].mean()
+    show_page_figure(page_figures, 'next_rental_shares', version)
 
 st.markdown("""Most late checkouts are still within the next 2 hours, so we can reasonably hope to significantly reduce risk by setting a threshold.
 Mobile check in type is more frequent, but otherwise the distribution is fairly close despite a little more NA's.""")
 
-connect_share = (data['checkin_type'].value_counts()/data['checkin_type'].count()*100)[1]
-mobile_share = (data['checkin_type'].value_counts()/data['checkin_type'].count()*100)[0]
-connect_canceled = (data[data['state']=='canceled']['checkin_type'].value_counts()/data[data['state']=='canceled']['checkin_type'].count()*100)[1]
+summary = exploration_summary(metrics)
+connect_share = summary['connect_share']
+mobile_share = summary['mobile_share']
+connect_canceled = summary['connect_canceled_share']
 
 st.markdown(f"""Mobile use is prevalent with a {round(mobile_share,2)}% share while Connect has a {round(connect_share,2)}% . 
 However, {round(connect_canceled)}% of cancellations are with Connect, suggesting a slightly bigger impact from cancellations on this type of rental flow. """)
 
-late_df = data[data['delays_checkout_min_cleaned']>0]
-
-drivers_late = len(late_df)
-drivers_total = len(data)
-percentage_drivers_late = drivers_late/drivers_total*100
-time_late = late_df['delays_checkout_min_cleaned'].sum()/len(late_df)
+percentage_drivers_late = summary['percentage_drivers_late']
+time_late = summary['time_late']
 
 st.markdown(f"On average, {round(percentage_drivers_late,2)} % of drivers are late and are {round(time_late,2)} minutes late.")
 
-st.markdown(f"Cancelled rentals represent {round(data[data['state']=='canceled']['state'].count()/data['state'].count()*100,2)}% of the total rentals.")
+st.markdown(f"Cancelled rentals represent {round(summary['canceled_share'],2)}% of the total rentals.")
 
 
 col1, col2= st.columns(2)
 with col1 :
 #plot 1    
-    fig = plt.figure(figsize=(10,6))
-    sns.histplot(data=data,x='time_delta_with_previous_rental_in_minutes')
-    plt.title('Distribution of time delta with previous rentals')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'time_delta_histogram', version)
 
 with col2 : 
-    fig = plt.figure(figsize=(10,6))
-    sns.histplot(data=data,x='delays_checkout_min_cleaned')
-    plt.title('Distribution of delays at checkout')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'delay_histogram', version)
 
 st.markdown("""There are still a lot of outliers even after removing the most extreme. 
 It would be interesting to have data on rental duration, since it is just stated that rentals are for "a few hours to a few days".""")
@@ -137,66 +105,22 @@ st.markdown("""We can look at the impact of delays on the business from 2 perspe
 - Business perspective
 """)
 
+profiler.mark('user experience sweep')
 # User experience
 st.subheader("User experience perspective")
 
 st.markdown("If we put in place a threshold between checkout and new checkin, how many drivers would be affected?")
 
-impacted_df = data.dropna(subset=['time_delta_with_previous_rental_in_minutes'])
-impacted_df['difference'] = impacted_df['time_delta_with_previous_rental_in_minutes'] - impacted_df['delays_checkout_min_cleaned']
-issues = len(impacted_df[impacted_df['difference'] < 0])
-issues_percentage = issues/len(data)*100
+issues = summary['issues']
+issues_percentage = summary['issues_percentage']
 
 st.markdown(f"""{issues} of drivers ({round(issues_percentage,2)}%) have an issue with the time delta between rentals and
-{len(impacted_df[impacted_df['difference'] < -30])} drivers causing an issue are more than 30 minutes late.
+{summary['issues_over_30']} drivers causing an issue are more than 30 minutes late.
 
-Implementing a 30 minutes delay would impact {len(impacted_df[impacted_df['time_delta_with_previous_rental_in_minutes'] < 30])} drivers.
+Implementing a 30 minutes delay would impact {summary['impacted_30']} drivers.
 """)
 
-threshold_range = np.arange(0, 60*12, step=15) # 15min intervals for 12 hours
-impacted_list_mobile = []
-impacted_list_connect = []
-impacted_list_total = []
-solved_list_mobile = []
-solved_list_connect = []
-solved_list_total = []
-
-solved_list = []
-for t in threshold_range:
-    impacted = impacted_df.dropna(subset=['time_delta_with_previous_rental_in_minutes'])
-    connect_impact = impacted[impacted['checkin_type'] == 'connect']
-    mobile_impact = impacted[impacted['checkin_type'] == 'mobile']
-    connect_impact = connect_impact[connect_impact['time_delta_with_previous_rental_in_minutes'] < t]
-    mobile_impact = mobile_impact[mobile_impact['time_delta_with_previous_rental_in_minutes'] < t]
-    impacted = impacted[impacted['time_delta_with_previous_rental_in_minutes'] < t]
-    impacted_list_connect.append(len(connect_impact))
-    impacted_list_mobile.append(len(mobile_impact))
-    impacted_list_total.append(len(impacted))
-
-    solved = impacted_df[impacted_df['difference'] < 0]
-    connect_solved = solved[solved['checkin_type'] == 'connect']
-    mobile_solved = solved[solved['checkin_type'] == 'mobile']
-    connect_solved = connect_solved[connect_solved['delay_at_checkout_in_minutes'] < t]
-    mobile_solved = mobile_solved[mobile_solved['delay_at_checkout_in_minutes'] < t]
-    solved = solved[solved['delay_at_checkout_in_minutes'] < t]
-    solved_list_connect.append(len(connect_solved))
-    solved_list_mobile.append(len(mobile_solved))
-    solved_list_total.append(len(solved))
-
-
-ax = fig.add_subplot(1, 1, 1)
-fig, ax = plt.subplots(1, 2, sharex=True, figsize=(20,7))
-ax[0].plot(threshold_range, solved_list_connect)
-ax[0].plot(threshold_range, solved_list_mobile)
-ax[0].plot(threshold_range, solved_list_total)
-ax[1].plot(threshold_range, impacted_list_connect)
-ax[1].plot(threshold_range, impacted_list_mobile)
-ax[1].plot(threshold_range, impacted_list_total)
-ax[0].set_xlabel('Threshold (min)')
-ax[0].set_ylabel('Number of impacted cases & cases solved')
-ax[0].legend(['Connect solved','Mobile solved','Total solved' ])
-ax[1].legend(['Connect impacted','Mobile impacted','Total impacted' ])
-st.pyplot(fig)
+show_page_figure(page_figures, 'threshold_curves', version)
 
 st.markdown("""We can see a similar behavior for both Connect and Mobile cases, though a plateau is hit a little faster for Connect rentals.
 There is unfortunately a significant number of other rentals impacted (that could not occur as they would have) in implementing the threshold, which has to be evaluated against the positive effects in user experience.
@@ -209,6 +133,7 @@ Overall the effect seems best if implemented on both Connect and Mobile rentals,
  """)
 
 
+profiler.mark('business sweep')
 # Money money money
 st.subheader("~~Loan Shark~~ Business perspective")
 
@@ -224,14 +149,14 @@ In this theoretical situation, let's look at:
 """)
 
 # selecting canceled rides
-canceled = (data['state'] == 'canceled').sum()
-median_rental = 119
-canceled_loss = canceled*median_rental 
+median_rental = MEDIAN_RENTAL
+business = business_summary(metrics, median_rental)
+canceled = business['canceled']
+canceled_loss = business['canceled_loss']
 
-number_delays = (data['delays_checkout_min_cleaned'] > 0).sum()
-sum_delays = data[data['delays_checkout_min_cleaned'] > 0]['delays_checkout_min_cleaned'].sum() # sum of delays superior to 0, in minutes
-minute_rate = median_rental/1440 #1440 minutes in a day
-late_revenue = sum_delays*minute_rate
+number_delays = business['number_delays']
+minute_rate = business['minute_rate']
+late_revenue = business['late_revenue']
 
 st.markdown(f"""At the median rate and assuming that an average rental is for 24 hours, the {canceled} cancellations totaled a {canceled_loss} \$ `max loss`.""")
 
@@ -253,39 +178,21 @@ This results in using **revenue and loss of profit** together with **zero tolera
 st.markdown(f"""Supposing a rate by the minute for a late checkout, the {number_delays} late arrivals brought in {round(late_revenue,2)} $ (not counting outliers).
 If late checkouts have to pay for the additional time at a rate by the minute, some of the "max loss" is mitigated.""")
 
-late_loss = canceled_loss - late_revenue
-st.markdown(f"""If canceled rentals were for less than {round(late_revenue/canceled_loss*24,2)} hours, additional revenue from late checkouts and loss from canceled rentals break even after 24 hours.
+late_loss = business['late_loss']
+st.markdown(f"""If canceled rentals were for less than {round(business['break_even_hours'],2)} hours, additional revenue from late checkouts and loss from canceled rentals break even after 24 hours.
 If cancelled rentals were supposed to last a full day, it potentially generates a {round(late_loss,2)} $ loss, again assuming all cancelled rentals were because of a late checkout.""")
 
-threshold_range = np.arange(0, 60*24, step=15) # 15min intervals in a day
-total_late_revenue = []
-for i in threshold_range:
-    late_revenue_growing = data[data['delays_checkout_min_cleaned'] > i]['delays_checkout_min_cleaned'].sum()*minute_rate
-    total_late_revenue.append(late_revenue_growing)
-total_late_revenue.reverse()
-
-fig, ax = plt.subplots(1, 2, sharex=True, figsize=(15,6))
-ax[0].plot(threshold_range/60, total_late_revenue)
-ax[0].hlines(y=canceled_loss/24*5.86, xmin=0, xmax=24, linewidth=2, color='r')
-ax[0].set_title('Assuming average canceled rentals were for 5.86 hours')
-ax[0].set_xlabel('Time (hours)')
-ax[1].set_xlabel('Time (hours)')
-ax[0].set_ylabel('Revenue $')
-ax[1].plot(threshold_range/60, total_late_revenue)
-ax[1].hlines(y=canceled_loss, xmin=0, xmax=24, linewidth=2, color='r')
-ax[0].legend(['Additional revenue','Max loss'], loc='center left')
-ax[1].set_title('Assuming average canceled rentals were for 24 hours')
-st.pyplot(fig)
+delay_index = metrics['delay_index']
+show_page_figure(page_figures, 'late_revenue_curves', version)
 
 
 st.markdown("""The `max loss` supposes a 24 hour average rental. If cancelled rentals were actually for smaller durations, there is much less impact.
 
 At this point we would really need more time data (duration of each ride, how much time a car spends unused, are there other cars available...) to accurately estimate losses.""")
 
-at_risk = number_delays*minute_rate*1440
-ended = (data['state'] == 'ended').sum()
-revenue = ended*median_rental + late_revenue
-risk_over_revenue = round(at_risk/(revenue),2)
+at_risk = business['at_risk']
+revenue = business['revenue']
+risk_over_revenue = round(business['risk_over_revenue'],2)
 
 st.markdown(f"""We can calculate the `maximum risk` of late arrivals.
 This is even more theoretical since it assumes:
@@ -304,20 +211,13 @@ It would be useful to have more data on this issue, such as maybe asking users w
 Next we'll try to set an acceptable threshold, but it would also be worthwhile to set a penalty for late arrivals and increase the rental rate after the due hour.""")
 
 # Risk over revenue with penalty
-penalty = 3  # penalty for late arrival is set at 3 times the normal minute rate
-risk_over_revenue_penalty= []
+penalty = PENALTY  # penalty for late arrival is set at 3 times the normal minute rate
+show_page_figure(page_figures, 'risk_curve', version)
 
-for t in threshold_range:
-    count = (data['delays_checkout_min_cleaned'] > t).sum()
-    late_revenue_penalty = data[data['delays_checkout_min_cleaned'] > t]['delays_checkout_min_cleaned'].sum() * minute_rate * 3
-    late_risk = count * median_rental
-    risk_over_revenue_penalty.append(late_risk/late_revenue_penalty)
-
-fig = plt.figure(figsize=(12,7))
-sns.lineplot(x=threshold_range,y=risk_over_revenue_penalty)
-plt.ylabel('Risk of 1 = max loss is equal to revenue from late arrivals')
-plt.title('Threshold time (in minutes) and risk over late revenue')
-st.pyplot(fig)
+chosen_threshold = st.slider('Threshold (min)', min_value=0, max_value=60*24-1, value=180, step=1)
+st.markdown(f"""With a {chosen_threshold} minutes threshold, {count_above(delay_index, chosen_threshold)} late checkouts remain,
+bringing in {round(revenue_above(delay_index, chosen_threshold, minute_rate, penalty),2)} $ with the penalty against a risk of {risk_above(delay_index, chosen_threshold, median_rental)} $
+(risk over late revenue of {round(risk_over_revenue_above(delay_index, chosen_threshold, median_rental, minute_rate, penalty),2)}).""")
 
 st.markdown("""For standard rentals of **1 day** and a **penalty of 3 times the normal minute rate** after the rental is due, with our current data we would need to set a **threshold of 180 minutes** to mitigate losses from late checkouts.
 
@@ -330,3 +230,5 @@ A significant caveat is that all this, on top of some assumptions (duration of r
 A reduced profit margin is not a perfectly accurate way to account for user discomfort and a new metric should be made, perhaps using the results of a poll to estimate the impact of delays on the user experience.
 
 It should also be noted that in order to fully measure the potential negative or positive impact of implementing this new delay, we would need start and end times of all rentals.""")
+
+show_profiling(profiler)
@@ -0,0 +1 @@
+"""Streamlit-free computations behind the Getaround dashboard pages."""
@@ -0,0 +1,31 @@
+"""Compute the dashboard reports from the command line.
+
+    python -m analytics delay data/*/delay_df.parquet --workers 4 --output delay_reports.json
+"""
+import argparse
+import json
+import sys
+
+from analytics.report import REPORTS, run_reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m analytics', description='Compute the dashboard reports for datasets.')
+    parser.add_argument('kind', choices=REPORTS)
+    parser.add_argument('paths', nargs='+', help='Parquet (or CSV) datasets, or dataset directories')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, 1 to stay in this process')
+    parser.add_argument('--output', help='JSON file to write, standard output by default')
+    args = parser.parse_args(argv)
+
+    results = run_reports(args.kind, args.paths, args.workers)
+    print(f"{results['datasets']} datasets in {results['seconds']:.2f}s "
+          f"({results['datasets_per_second']:.2f} datasets/s)", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Aggregates behind the dashboard pages, computed once per dataset version.
+
+The pages cache these dicts keyed by `dataset_version`, a hash of the data
+content, so widget interactions only re-render from small precomputed values.
+Counts are kept rather than percentages so they can be combined.
+"""
+import hashlib
+
+import pandas as pd
+
+from analytics.binning import bin_counts, leaf_sums
+from analytics.cube import build_pricing_cube, group_stats, slice_stats
+from analytics.revenue import build_delay_index
+from analytics.thresholds import build_impact_index
+
+
+# columns of delay_df read by the Delay page
+DELAY_COLUMNS = ['checkin_type', 'state', 'delay_at_checkout_in_minutes', 'time_delta_with_previous_rental_in_minutes',
+                 'checkout', 'next_rental', 'delays_checkout_min_cleaned']
+IMPACT_COLUMNS = ['checkin_type', 'time_delta_with_previous_rental_in_minutes',
+                  'delay_at_checkout_in_minutes', 'delays_checkout_min_cleaned']
+
+
+def dataset_version(data):
+    hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes() + ','.join(data.columns).encode()).hexdigest()
+
+
+def count_frame(counts):
+    # counts per group as a frame with a `count` and a `percentage` of the total column
+    frame = counts.reset_index(name='count')
+    frame['percentage'] = frame['count'] / frame['count'].sum() * 100
+    return frame
+
+
+def share(counts, label):
+    return counts.get(label, 0) / counts.sum() * 100
+
+
+def impacted_rentals(data):
+    # rentals with a previous one, and the margin left between the previous checkout delay and the time delta
+    # only the columns the impact index needs are copied
+    impacted_df = data.loc[data['time_delta_with_previous_rental_in_minutes'].notna(), IMPACT_COLUMNS]
+    return impacted_df.assign(difference=impacted_df['time_delta_with_previous_rental_in_minutes'] - impacted_df['delays_checkout_min_cleaned'])
+
+
+def delay_metrics(data):
+    checked_out = data['delay_at_checkout_in_minutes'].notna()
+    canceled = data['state'] == 'canceled'
+    late = data['delays_checkout_min_cleaned'] > 0
+    impacted_df = impacted_rentals(data)
+    return {
+        'rentals': len(data),
+        'checkout_counts': data.loc[checked_out, ['checkin_type', 'checkout']].groupby(['checkin_type', 'checkout'], observed=True).size(),
+        'next_rental_counts': data.groupby(['checkin_type', 'next_rental'], observed=True).size(),
+        'checkin_counts': data['checkin_type'].value_counts(),
+        'canceled_checkin_counts': data.loc[canceled, 'checkin_type'].value_counts(),
+        'state_counts': data['state'].value_counts(),
+        'late_count': int(late.sum()),
+        # stored as float32, summed in float64 to avoid drifting on large datasets
+        'late_minutes': float(data.loc[late, 'delays_checkout_min_cleaned'].to_numpy(dtype=float).sum()),
+        'issues': int((impacted_df['difference'] < 0).sum()),
+        'issues_over_30': int((impacted_df['difference'] < -30).sum()),
+        'impact_index': build_impact_index(impacted_df),
+        'delay_index': build_delay_index(data['delays_checkout_min_cleaned']),
+        'time_delta_bins': bin_counts(data['time_delta_with_previous_rental_in_minutes']),
+        'delay_bins': bin_counts(data['delays_checkout_min_cleaned']),
+    }
+
+
+def pricing_metrics(data):
+    # per brand figures and correlations come from the pricing cube, built in a single pass over the rows
+    cube = build_pricing_cube(data)
+    _, models_mean, models_sum = group_stats(cube, 'model_key')
+    return {
+        'cube': cube,
+        'models_mean': models_mean.sort_values(by='rental_price_per_day', ascending=False),
+        'models_sum': models_sum.sort_values('rental_price_per_day', ascending=False),
+        'corr': slice_stats(cube)['corr'],
+        'brand_car_type_sums': leaf_sums(data, ['model_key', 'car_type'], 'rental_price_per_day'),
+        'price_bins': bin_counts(data['rental_price_per_day']),
+        'mileage_bins': bin_counts(data['mileage']),
+    }
@@ -0,0 +1,76 @@
+"""Chart payloads computed ahead of time with NumPy.
+
+Histograms are reduced to bin counts and sunbursts to one node per level of
+the hierarchy, so the size of what is plotted and sent to the browser does
+not grow with the number of rentals. Both can be updated with new rows
+without going through the whole history again.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_BINS = 200
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def bin_counts(values, bins='auto', max_bins=MAX_BINS):
+    # same edges as sns.histplot ('auto'), with at most `max_bins` bins for long tailed columns
+    values = _finite(values)
+    edges = np.histogram_bin_edges(values, bins=bins)
+    if len(edges) - 1 > max_bins:
+        edges = np.histogram_bin_edges(values, bins=max_bins)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def _merge_pairs(counts, edges):
+    # halves the number of bins, an odd last bin is padded with an empty one
+    if len(counts) % 2:
+        counts = np.append(counts, 0)
+        edges = np.append(edges, 2 * edges[-1] - edges[-2])
+    return counts.reshape(-1, 2).sum(axis=1), edges[::2]
+
+
+def update_bin_counts(counts, edges, new_values, max_bins=MAX_BINS):
+    # the edges are extended by whole bin widths to hold new values outside them,
+    # then bins are merged by pairs while there are more than `max_bins`
+    # values already counted on the previous upper edge stay in the bin that was closed on it
+    new_values = _finite(new_values)
+    if len(new_values):
+        width = edges[1] - edges[0]
+        below = int(np.ceil((edges[0] - new_values.min()) / width)) if new_values.min() < edges[0] else 0
+        above = int(np.ceil((new_values.max() - edges[-1]) / width)) if new_values.max() > edges[-1] else 0
+        if below or above:
+            edges = np.concatenate([edges[0] - width * np.arange(below, 0, -1), edges,
+                                    edges[-1] + width * np.arange(1, above + 1)])
+            counts = np.concatenate([np.zeros(below, dtype=counts.dtype), counts, np.zeros(above, dtype=counts.dtype)])
+            while len(counts) > max_bins:
+                counts, edges = _merge_pairs(counts, edges)
+    return counts + np.histogram(new_values, bins=edges)[0], edges
+
+
+def leaf_sums(data, path, values):
+    return data.groupby(path, observed=True)[values].sum()
+
+
+def update_leaf_sums(sums, new_rows, path, values):
+    return sums.add(leaf_sums(new_rows, path, values), fill_value=0)
+
+
+def sunburst_nodes(sums):
+    # sums : leaf_sums output, indexed by every level of the path
+    # returns one row per node with the ids/labels/parents/values expected by go.Sunburst
+    nodes = []
+    for depth in range(1, sums.index.nlevels + 1):
+        level = sums.groupby(level=list(range(depth)), observed=True).sum() if depth < sums.index.nlevels else sums
+        keys = [key if isinstance(key, tuple) else (key,) for key in level.index]
+        nodes.append(pd.DataFrame({
+            'ids': ['/'.join(map(str, key)) for key in keys],
+            'labels': [str(key[-1]) for key in keys],
+            'parents': ['/'.join(map(str, key[:-1])) for key in keys],
+            'values': level.to_numpy(),
+        }))
+    return pd.concat(nodes, ignore_index=True)
@@ -0,0 +1,132 @@
+"""Dataset layout of the pages and the disk caches of their aggregates and figures.
+
+Aggregates are pickled per dataset version and figure payloads per figure key,
+under CACHE_DIR, so they survive restarts and are shared by every server
+process of the box. Both caches live in a directory named after CODE_VERSION,
+a hash of the analytics sources and the pandas version, so a deploy never
+loads pickles made by other code. analytics.warmup fills them before the
+server starts and `prune` removes the entries the pages no longer use.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+
+import pandas as pd
+
+from analytics.aggregates import DELAY_COLUMNS, dataset_version, delay_metrics, pricing_metrics
+from analytics.ingest import fetch_dataset, load_manifest, manifest_version, read_columns, read_parts
+from analytics.storage import CACHE_DIR, BlobNotFound, atomic_write, fetch_blob
+
+BUCKET_NAME = 'get_around_data'
+
+
+def _code_version():
+    digest = hashlib.sha1(pd.__version__.encode())
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(package_dir, name), 'rb') as f:
+                digest.update(name.encode() + f.read())
+    return digest.hexdigest()[:12]
+
+
+CODE_VERSION = _code_version()
+METRICS_ROOT = os.path.join(CACHE_DIR, 'metrics')
+FIGURES_ROOT = os.path.join(CACHE_DIR, 'figures')
+METRICS_DIR = os.path.join(METRICS_ROOT, CODE_VERSION)
+FIGURES_DIR = os.path.join(FIGURES_ROOT, CODE_VERSION)
+
+# file, or dataset directory with a fallback on the plain `delay_df.parquet` (see read_dataset), and columns read by each page
+# the ids are only shown by the raw data viewer, read along the aggregated columns so a page memoizes a single copy
+DELAY_ID_COLUMNS = ['rental_id', 'car_id', 'previous_ended_rental_id']
+DATASETS = {'delay': ('delay_df', DELAY_ID_COLUMNS + DELAY_COLUMNS), 'pricing': ('pricing_df.parquet', None)}
+
+
+def _load(path):
+    # any unreadable entry (truncated, written by other code) is a cache miss and gets overwritten
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _store(path, value):
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    with atomic_write(path) as f:
+        pickle.dump(value, f)
+
+
+def _cached(path, compute):
+    value = _load(path)
+    if value is None:
+        value = compute()
+        _store(path, value)
+    return value
+
+
+def metrics_path(page, version):
+    return os.path.join(METRICS_DIR, f'{page}-{version}.pkl')
+
+
+def figure_path(key):
+    # key : figure name, dataset version and plot parameters
+    return os.path.join(FIGURES_DIR, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+
+def cached_metrics(page, version, data):
+    compute = delay_metrics if page == 'delay' else pricing_metrics
+    return _cached(metrics_path(page, version), lambda: compute(data))
+
+
+def load_metrics(page, version):
+    return _load(metrics_path(page, version))
+
+
+def store_metrics(page, version, metrics):
+    # aggregates updated without the rows, see analytics.incremental
+    _store(metrics_path(page, version), metrics)
+
+
+def cached_figure(key, build):
+    # only for the page figures : ad hoc figures (drill-down selections) would grow the cache without bound
+    from analytics.figures import render_payload
+    return _cached(figure_path(key), lambda: render_payload(build()))
+
+
+def prune(keep):
+    # removes the cache directories of other code versions and the entries missing from `keep`
+    for root, current in ((METRICS_ROOT, METRICS_DIR), (FIGURES_ROOT, FIGURES_DIR)):
+        if not os.path.isdir(root):
+            continue
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if path != current:
+                shutil.rmtree(path, ignore_errors=True)
+        if os.path.isdir(current):
+            for name in os.listdir(current):
+                path = os.path.join(current, name)
+                if path not in keep:
+                    os.remove(path)
+
+
+def read_dataset(bucket, name, columns=None):
+    # a single Parquet blob, or a dataset directory whose version comes from its manifest
+    # a name without extension is the `name` directory when it has a manifest, `name.parquet` otherwise
+    if not name.endswith('.parquet'):
+        try:
+            directory = fetch_dataset(bucket, name)
+        except BlobNotFound:
+            name = f'{name}.parquet'
+    if name.endswith('.parquet'):
+        data = read_columns(fetch_blob(bucket, name), columns)
+        return data, dataset_version(data)
+    manifest = load_manifest(directory)
+    return read_parts(directory, columns, manifest), manifest_version(manifest)
+
+
+def load_page(bucket, page):
+    # dataset of a page and its version, as read by the pages
+    file_path, columns = DATASETS[page]
+    return read_dataset(bucket, file_path, columns)
@@ -0,0 +1,76 @@
+"""Pricing cube : count, sums and sums of products per combination of car attributes.
+
+One cell per (model_key, car_type, fuel, paint_color, option flags) present in
+the data. Means, totals, variances and pairwise correlations of any slice come
+from adding up the cells of that slice, without going back to the rows.
+"""
+from itertools import combinations_with_replacement
+
+import numpy as np
+import pandas as pd
+
+from analytics.schema import PRICING_SCHEMA
+
+OPTIONS = [column for column, dtype in PRICING_SCHEMA.items() if dtype == 'bool']
+DIMENSIONS = ['model_key', 'car_type', 'fuel', 'paint_color'] + OPTIONS
+MEASURES = ['mileage', 'engine_power'] + OPTIONS + ['rental_price_per_day']
+
+
+def build_pricing_cube(data):
+    dimensions = [column for column in DIMENSIONS if column in data.columns]
+    measures = [column for column in MEASURES if column in data.columns]
+    grouped = data.groupby(dimensions, observed=True, sort=False, dropna=False)
+    cell = grouped.ngroup().to_numpy()
+    cells = len(grouped)
+    values = data[measures].to_numpy(dtype=float)
+    pairs = list(combinations_with_replacement(range(len(measures)), 2))
+    # one bincount per measure and pair of measures, no rows x pairs matrix is built
+    return {
+        'dimensions': grouped.size().index.to_frame(index=False),
+        'measures': measures,
+        'pairs': pairs,
+        'count': np.bincount(cell, minlength=cells).astype(float),
+        'sums': np.column_stack([np.bincount(cell, weights=values[:, i], minlength=cells) for i in range(len(measures))]),
+        'cross': np.column_stack([np.bincount(cell, weights=values[:, i] * values[:, j], minlength=cells) for i, j in pairs]),
+    }
+
+
+def cube_mask(cube, filters=None):
+    # filters : {dimension: allowed values}, an empty selection keeps every cell
+    mask = np.ones(len(cube['count']), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= cube['dimensions'][column].isin(values).to_numpy()
+    return mask
+
+
+def slice_stats(cube, filters=None):
+    mask = cube_mask(cube, filters)
+    measures = cube['measures']
+    n = cube['count'][mask].sum()
+    sums = cube['sums'][mask].sum(axis=0)
+    cross = np.zeros((len(measures), len(measures)))
+    for (i, j), total in zip(cube['pairs'], cube['cross'][mask].sum(axis=0)):
+        cross[i, j] = cross[j, i] = total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / n
+        covariance = (cross - np.outer(sums, sums) / n) / (n - 1)  # sample covariance, as pandas
+        std = np.sqrt(np.diag(covariance))
+        corr = covariance / np.outer(std, std)
+    return {
+        'count': int(n),
+        'sum': pd.Series(sums, index=measures),
+        'mean': pd.Series(mean, index=measures),
+        'var': pd.Series(np.diag(covariance), index=measures),
+        'corr': pd.DataFrame(corr, index=measures, columns=measures),
+    }
+
+
+def group_stats(cube, by, filters=None):
+    # count, means and sums of every measure per value of the `by` dimension, within the filtered slice
+    mask = cube_mask(cube, filters)
+    keys = cube['dimensions'].loc[mask, by].to_numpy()
+    sums = pd.DataFrame(cube['sums'][mask], columns=cube['measures']).groupby(keys).sum()
+    count = pd.Series(cube['count'][mask]).groupby(keys).sum()
+    sums.index.name = by
+    return count.rename_axis(by), sums.div(count.to_numpy(), axis=0), sums
@@ -0,0 +1,182 @@
+"""Figures of the dashboard pages, built from precomputed aggregates.
+
+Matplotlib figures are rendered to PNG bytes and closed right away, so long
+lived server processes don't accumulate open figures. Histograms and sunbursts
+take the pre-aggregated payloads of analytics.binning and are drawn with
+Plotly, so only bins and nodes are sent to the browser.
+
+The plotting libraries are imported on first use : a page served from the
+figure cache never loads matplotlib, seaborn or plotly.
+"""
+import io
+
+import numpy as np
+
+from analytics.aggregates import count_frame
+from analytics.binning import sunburst_nodes
+from analytics.report import MEDIAN_RENTAL, PENALTY, SHORT_RENTAL_HOURS, USER_THRESHOLDS, business_summary
+from analytics.revenue import revenue_above, risk_over_revenue_above
+from analytics.thresholds import impact_curves
+
+
+def _matplotlib():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+def _plotly():
+    import plotly.graph_objects as go
+    return go
+
+
+def render_png(fig, dpi=100):
+    plt, _ = _matplotlib()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def render_payload(fig):
+    # ('plotly', JSON) for Plotly figures, ('png', bytes) for matplotlib figures
+    if hasattr(fig, 'savefig'):
+        return 'png', render_png(fig)
+    return 'plotly', fig.to_json()
+
+
+def share_barplot(frame, hue, title):
+    # frame : output of analytics.aggregates.count_frame, grouped by checkin type and `hue`
+    plt, sns = _matplotlib()
+    fig = plt.figure(figsize=(10,6))
+    sns.barplot(y=frame['percentage'], x=frame['checkin_type'], hue=frame[hue], orient='vertical')
+    plt.title(title)
+    return fig
+
+
+def threshold_curves(threshold_range, curves):
+    plt, _ = _matplotlib()
+    fig, ax = plt.subplots(1, 2, sharex=True, figsize=(20,7))
+    ax[0].plot(threshold_range, curves['solved_connect'])
+    ax[0].plot(threshold_range, curves['solved_mobile'])
+    ax[0].plot(threshold_range, curves['solved_total'])
+    ax[1].plot(threshold_range, curves['impacted_connect'])
+    ax[1].plot(threshold_range, curves['impacted_mobile'])
+    ax[1].plot(threshold_range, curves['impacted_total'])
+    ax[0].set_xlabel('Threshold (min)')
+    ax[0].set_ylabel('Number of impacted cases & cases solved')
+    ax[0].legend(['Connect solved','Mobile solved','Total solved' ])
+    ax[1].legend(['Connect impacted','Mobile impacted','Total impacted' ])
+    return fig
+
+
+def late_revenue_curves(threshold_range, total_late_revenue, canceled_loss, short_rental_hours=SHORT_RENTAL_HOURS):
+    plt, _ = _matplotlib()
+    fig, ax = plt.subplots(1, 2, sharex=True, figsize=(15,6))
+    ax[0].plot(threshold_range/60, total_late_revenue)
+    ax[0].hlines(y=canceled_loss/24*short_rental_hours, xmin=0, xmax=24, linewidth=2, color='r')
+    ax[0].set_title(f'Assuming average canceled rentals were for {short_rental_hours} hours')
+    ax[0].set_xlabel('Time (hours)')
+    ax[1].set_xlabel('Time (hours)')
+    ax[0].set_ylabel('Revenue $')
+    ax[1].plot(threshold_range/60, total_late_revenue)
+    ax[1].hlines(y=canceled_loss, xmin=0, xmax=24, linewidth=2, color='r')
+    ax[0].legend(['Additional revenue','Max loss'], loc='center left')
+    ax[1].set_title('Assuming average canceled rentals were for 24 hours')
+    return fig
+
+
+def risk_curve(threshold_range, risk_over_revenue_penalty):
+    plt, sns = _matplotlib()
+    fig = plt.figure(figsize=(12,7))
+    sns.lineplot(x=threshold_range, y=risk_over_revenue_penalty)
+    plt.ylabel('Risk of 1 = max loss is equal to revenue from late arrivals')
+    plt.title('Threshold time (in minutes) and risk over late revenue')
+    return fig
+
+
+def brand_barplot(models_df, palette, title):
+    plt, sns = _matplotlib()
+    fig = plt.figure(figsize=(10,6))
+    sns.barplot(x=models_df.index, y=models_df['rental_price_per_day'], order=models_df.index, palette=palette)
+    plt.xticks(rotation=60)
+    plt.title(title)
+    return fig
+
+
+def correlation_heatmap(corr_mx):
+    plt, sns = _matplotlib()
+    fig = plt.figure(figsize=(12,7))
+    matrix = np.triu(corr_mx) # take upper correlation matrix
+    sns.heatmap(corr_mx, mask=matrix, annot=True, cmap='YlGnBu', linewidths=0.1, square=True)
+    return fig
+
+
+def prediction_scatter(actual, predicted):
+    plt, _ = _matplotlib()
+    fig = plt.figure(figsize=(10,6))
+    plt.scatter(actual, predicted, s=4, alpha=0.3)
+    low, high = min(actual.min(), predicted.min()), max(actual.max(), predicted.max())
+    plt.plot([low, high], [low, high], color='r', linewidth=1)
+    plt.xlabel('Actual rental price per day')
+    plt.ylabel('Predicted rental price per day')
+    plt.title('Predicted vs actual rental price per day')
+    return fig
+
+
+def histogram(counts, edges, title, xlabel=None):
+    # pre-binned histogram : one bar per bin, whatever the number of rows
+    go = _plotly()
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges)))
+    fig.update_layout(title=title, xaxis_title=xlabel, yaxis_title='Count', bargap=0)
+    return fig
+
+
+
+def sunburst(nodes, title, hover_label=None, width=1000, height=800):
+    # nodes : analytics.binning.sunburst_nodes output
+    go = _plotly()
+    fig = go.Figure(go.Sunburst(ids=nodes['ids'], labels=nodes['labels'], parents=nodes['parents'],
+                                values=nodes['values'], branchvalues='total',
+                                hovertemplate=f'%{{label}}<br>{hover_label or "value"}=%{{value}}<extra></extra>'))
+    fig.update_layout(title=title, width=width, height=height)
+    return fig
+
+
+def delay_page_figures(metrics, median_rental=MEDIAN_RENTAL, penalty=PENALTY):
+    # {name: (plot parameters, builder)} of the figures of the Delay page that only depend on the aggregates
+    summary = business_summary(metrics, median_rental)
+    minute_rate, canceled_loss = summary['minute_rate'], summary['canceled_loss']
+    revenue_range = np.arange(0, 60*24, step=1) # 1min intervals in a day
+    return {
+        'checkout_shares': ((), lambda: share_barplot(count_frame(metrics['checkout_counts']), 'checkout',
+                                                      'Mobile and Connect rentals per checkout delay')),
+        'next_rental_shares': ((), lambda: share_barplot(count_frame(metrics['next_rental_counts']), 'next_rental',
+                                                         'Next rental or not depending on checkin type')),
+        'time_delta_histogram': ((), lambda: histogram(*metrics['time_delta_bins'], 'Distribution of time delta with previous rentals',
+                                                       'time_delta_with_previous_rental_in_minutes')),
+        'delay_histogram': ((), lambda: histogram(*metrics['delay_bins'], 'Distribution of delays at checkout',
+                                                  'delays_checkout_min_cleaned')),
+        'threshold_curves': ((), lambda: threshold_curves(USER_THRESHOLDS, impact_curves(metrics['impact_index'], USER_THRESHOLDS))),
+        'late_revenue_curves': ((median_rental,), lambda: late_revenue_curves(
+            revenue_range, revenue_above(metrics['delay_index'], revenue_range, minute_rate)[::-1], canceled_loss)),
+        'risk_curve': ((median_rental, penalty), lambda: risk_curve(
+            revenue_range, risk_over_revenue_above(metrics['delay_index'], revenue_range, median_rental, minute_rate, penalty))),
+    }
+
+
+def pricing_page_figures(metrics):
+    # {name: (plot parameters, builder)} of the figures of the Pricing page that only depend on the aggregates
+    return {
+        'revenue_sunburst': ((), lambda: sunburst(sunburst_nodes(metrics['brand_car_type_sums']),
+                                                  'Rental revenue per day per brand and car type', 'Rental revenue per day')),
+        'models_mean': ((), lambda: brand_barplot(metrics['models_mean'], 'Set2', 'Average rental price per day per brand')),
+        'models_sum': ((), lambda: brand_barplot(metrics['models_sum'], 'husl', 'Total rental revenue per day per brand')),
+        'correlation_heatmap': ((), lambda: correlation_heatmap(metrics['corr'])),
+        'price_histogram': ((), lambda: histogram(*metrics['price_bins'], 'Distribution of rental price per day', 'rental_price_per_day')),
+        'mileage_histogram': ((), lambda: histogram(*metrics['mileage_bins'], 'Distribution of mileage', 'mileage')),
+    }
+
+
+def page_figures(page, metrics):
+    return delay_page_figures(metrics) if page == 'delay' else pricing_page_figures(metrics)
@@ -0,0 +1,175 @@
+"""Append-only ingestion of new rentals.
+
+The delay dataset is a directory of Parquet parts (see analytics.ingest). A
+batch of new rentals is written as a new part, with the derived columns of
+`delay_df` (`checkout`, `next_rental` and `delays_checkout_min_cleaned`)
+computed for the new rows only. Previous rentals referenced by
+`previous_ended_rental_id` are flagged as having a next rental in the
+manifest instead of rewriting their part. Only the history rows matching the
+batch ids are read, and the aggregates of analytics.aggregates are updated in
+place from the batch and stored in the metrics cache of the pages under the
+new dataset version, so the refresh cost scales with the batch.
+
+    python -m analytics.incremental init delay_df.parquet delay_df
+    python -m analytics.incremental append delay_df new_rentals.csv
+
+The pages read the plain `delay_df.parquet` until `init` created the
+directory. The first `append` checks that the derived columns of the history
+follow the conventions used for new rows, and fails otherwise.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from analytics.aggregates import dataset_version, delay_metrics, impacted_rentals
+from analytics.binning import update_bin_counts
+from analytics.ingest import load_manifest, manifest_version, next_rental_ids, read_columns, read_parts, save_manifest
+from analytics.revenue import merge_delay_index
+from analytics.schema import DELAY_SCHEMA, apply_schema
+from analytics.thresholds import merge_impact_index
+from analytics.cache import load_metrics, store_metrics
+
+# Assumed conventions of the offline export, checked against the history by `init` :
+# checkout delay buckets (right inclusive) and delays beyond one day either way considered as outliers.
+CHECKOUT_BINS = [-np.inf, 0, 15, 60, 120, np.inf]
+CHECKOUT_LABELS = ['on time', 'late < 15 min', 'late < 1 hour', 'late < 2 hours', 'late > 2 hours']
+DELAY_OUTLIER_LIMIT = 24 * 60
+
+
+def derive_columns(batch):
+    batch = batch.copy()
+    delay = batch['delay_at_checkout_in_minutes']
+    batch['checkout'] = pd.cut(delay, bins=CHECKOUT_BINS, labels=CHECKOUT_LABELS).astype(object)
+    batch['delays_checkout_min_cleaned'] = delay.where(delay.abs() <= DELAY_OUTLIER_LIMIT)
+    # rentals of the batch followed by another rental of the same batch
+    batch['next_rental'] = batch['rental_id'].isin(batch['previous_ended_rental_id'].dropna())
+    return batch
+
+
+def check_derived_columns(data):
+    # the derived columns of new rows must match the ones the offline export produced
+    derived = derive_columns(data)
+    mismatches = {
+        'checkout': (derived['checkout'].fillna('') != data['checkout'].astype(object).fillna('')).sum(),
+        'delays_checkout_min_cleaned': (~np.isclose(derived['delays_checkout_min_cleaned'], data['delays_checkout_min_cleaned'],
+                                                    equal_nan=True)).sum(),
+        'next_rental': (derived['next_rental'] != data['next_rental'].astype(bool)).sum(),
+    }
+    mismatches = {column: int(count) for column, count in mismatches.items() if count}
+    if mismatches:
+        raise ValueError(f'derived columns differ from the stored ones on {mismatches} rows, '
+                         'check CHECKOUT_BINS, CHECKOUT_LABELS and DELAY_OUTLIER_LIMIT')
+
+
+def _part_name(index):
+    return f'part-{index:05d}.parquet'
+
+
+def init_dataset(parquet_path, directory):
+    # dataset directory holding the current history as its first part
+    data = apply_schema(read_columns(parquet_path))
+    os.makedirs(directory, exist_ok=True)
+    data.to_parquet(os.path.join(directory, _part_name(0)), engine='pyarrow', index=False)
+    manifest = {'parts': [{'file': _part_name(0), 'version': dataset_version(data), 'next_rental_ids': []}]}
+    save_manifest(directory, manifest)
+    return manifest
+
+
+def _history_rows(directory, manifest, rental_ids):
+    # rows of the history with one of `rental_ids`, row groups are skipped on their statistics
+    filters = [('rental_id', 'in', sorted(rental_ids))]
+    parts = [pq.read_table(os.path.join(directory, part['file']), columns=['rental_id', 'checkin_type', 'next_rental'],
+                           filters=filters).to_pandas() for part in manifest['parts']]
+    history = pd.concat(parts, ignore_index=True)
+    history['next_rental'] = history['next_rental'] | history['rental_id'].isin(next_rental_ids(manifest))
+    return history
+
+
+def _add_counts(counts, new_counts):
+    return counts.add(new_counts, fill_value=0).astype(int)
+
+
+def append_rentals(directory, metrics, batch):
+    # directory : delay dataset directory, metrics : its analytics.aggregates.delay_metrics
+    # writes the batch as a new part and returns the new manifest, metrics are updated in place
+    manifest = load_manifest(directory)
+    if not manifest.get('derived_columns_checked'):
+        # once per dataset, before the first batch relies on the conventions
+        check_derived_columns(read_parts(directory, manifest=manifest))
+        manifest['derived_columns_checked'] = True
+    previous_ids = batch['previous_ended_rental_id'].dropna().astype(int)
+    history = _history_rows(directory, manifest, set(batch['rental_id'].astype(int)) | set(previous_ids))
+    batch = derive_columns(batch[~batch['rental_id'].isin(history['rental_id'])])
+    if batch.empty:
+        return manifest
+
+    # previous rentals now followed by a rental of the batch
+    flipped = history.loc[history['rental_id'].isin(previous_ids) & ~history['next_rental'], ['rental_id', 'checkin_type']]
+    if len(flipped):
+        keys = ['checkin_type', 'next_rental']
+        metrics['next_rental_counts'] = _add_counts(
+            metrics['next_rental_counts'],
+            flipped.assign(next_rental=True).groupby(keys, observed=True).size().sub(
+                flipped.assign(next_rental=False).groupby(keys, observed=True).size(), fill_value=0))
+
+    checkout_clean = batch.dropna(subset=['delay_at_checkout_in_minutes'])
+    canceled = batch['state'] == 'canceled'
+    late = batch['delays_checkout_min_cleaned'] > 0
+    impacted_df = impacted_rentals(batch)
+    metrics['rentals'] += len(batch)
+    metrics['checkout_counts'] = _add_counts(metrics['checkout_counts'], checkout_clean.groupby(['checkin_type', 'checkout']).size())
+    metrics['next_rental_counts'] = _add_counts(metrics['next_rental_counts'], batch.groupby(['checkin_type', 'next_rental']).size())
+    metrics['checkin_counts'] = _add_counts(metrics['checkin_counts'], batch['checkin_type'].value_counts())
+    metrics['canceled_checkin_counts'] = _add_counts(metrics['canceled_checkin_counts'], batch.loc[canceled, 'checkin_type'].value_counts())
+    metrics['state_counts'] = _add_counts(metrics['state_counts'], batch['state'].value_counts())
+    metrics['late_count'] += int(late.sum())
+    metrics['late_minutes'] += float(batch.loc[late, 'delays_checkout_min_cleaned'].to_numpy(dtype=float).sum())
+    metrics['issues'] += int((impacted_df['difference'] < 0).sum())
+    metrics['issues_over_30'] += int((impacted_df['difference'] < -30).sum())
+    merge_impact_index(metrics['impact_index'], impacted_df)
+    metrics['delay_index'] = merge_delay_index(metrics['delay_index'], batch['delays_checkout_min_cleaned'])
+    metrics['time_delta_bins'] = update_bin_counts(*metrics['time_delta_bins'], batch['time_delta_with_previous_rental_in_minutes'])
+    metrics['delay_bins'] = update_bin_counts(*metrics['delay_bins'], batch['delays_checkout_min_cleaned'])
+
+    # the manifest is saved last, readers never see a part before it is complete
+    columns = pq.read_schema(os.path.join(directory, manifest['parts'][0]['file'])).names
+    part = apply_schema(batch[columns], DELAY_SCHEMA)
+    name = _part_name(len(manifest['parts']))
+    part.to_parquet(os.path.join(directory, name), engine='pyarrow', index=False)
+    manifest['parts'].append({'file': name, 'version': dataset_version(part),
+                              'next_rental_ids': flipped['rental_id'].astype(int).tolist()})
+    save_manifest(directory, manifest)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Append batches of new rentals to the delay dataset directory.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    init = commands.add_parser('init', help='create the dataset directory from the current delay_df.parquet')
+    init.add_argument('parquet_path')
+    init.add_argument('directory')
+    append = commands.add_parser('append', help='append a CSV batch of new rentals')
+    append.add_argument('directory')
+    append.add_argument('batch_csv')
+    args = parser.parse_args(argv)
+
+    if args.command == 'init':
+        manifest = init_dataset(args.parquet_path, args.directory)
+        print(f"{args.directory} created, version {manifest_version(manifest)}")
+        return
+
+    # aggregates come from the metrics cache of the pages, and are only computed from the rows once
+    manifest = load_manifest(args.directory)
+    metrics = load_metrics('delay', manifest_version(manifest))
+    if metrics is None:
+        metrics = delay_metrics(read_parts(args.directory, manifest=manifest))
+    manifest = append_rentals(args.directory, metrics, pd.read_csv(args.batch_csv))
+    store_metrics('delay', manifest_version(manifest), metrics)
+    print(f"{metrics['rentals']} rentals, {metrics['late_count']} late checkouts, version {manifest_version(manifest)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Typed Parquet copies of the dashboard datasets.
+
+`delay_df.csv` and `pricing_df.csv` are converted once with the compact dtypes
+of analytics.schema, then the pages read back only the columns they need instead of
+parsing the whole CSV on every cache miss.
+
+    python -m analytics.ingest delay_df.csv delay_df.parquet
+
+A dataset can also be a directory of immutable Parquet parts listed in
+`manifest.json`, so new rows are appended as a new part (see
+analytics.incremental). Each part entry holds the file name, the
+`dataset_version` of the part and `next_rental_ids`, the earlier rentals
+followed by a rental of the part. The dataset version is a hash of the
+manifest, so it is known without reading the rows.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from analytics.schema import apply_schema
+from analytics.storage import atomic_write, fetch_blob
+
+MANIFEST = 'manifest.json'
+
+
+def to_parquet_path(csv_path):
+    return csv_path[:-len('.csv')] + '.parquet' if csv_path.endswith('.csv') else csv_path + '.parquet'
+
+
+def convert_csv(csv_source, parquet_path):
+    data = apply_schema(pd.read_csv(csv_source))
+    data.to_parquet(parquet_path, engine='pyarrow', index=False)
+    return parquet_path
+
+
+def read_columns(source, columns=None):
+    # source : local path (memory-mapped) or file-like object holding Parquet bytes
+    table = pq.read_table(source, columns=columns, memory_map=isinstance(source, str))
+    return table.to_pandas()
+
+
+def load_manifest(directory):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+def save_manifest(directory, manifest):
+    # the manifest is what makes a new part visible
+    with atomic_write(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+
+def manifest_version(manifest):
+    return hashlib.sha1(json.dumps(manifest['parts'], sort_keys=True).encode()).hexdigest()
+
+
+def next_rental_ids(manifest):
+    return [rental_id for part in manifest['parts'] for rental_id in part['next_rental_ids']]
+
+
+def read_parts(directory, columns=None, manifest=None):
+    # rows of every part of a dataset directory, with the next rentals flagged after their part was written
+    manifest = manifest or load_manifest(directory)
+    flag = columns is None or 'next_rental' in columns
+    read = columns if columns is None or not flag or 'rental_id' in columns else list(columns) + ['rental_id']
+    # categories may differ between parts, the schema is applied again on the whole
+    data = apply_schema(pd.concat([read_columns(os.path.join(directory, part['file']), read)
+                                   for part in manifest['parts']], ignore_index=True))
+    if flag:
+        data['next_rental'] = data['next_rental'] | data['rental_id'].isin(next_rental_ids(manifest))
+    return data if columns is None else data[columns]
+
+
+def fetch_dataset(bucket, name):
+    # local copy of a dataset directory of the bucket, parts are only downloaded once
+    manifest_path = fetch_blob(bucket, f'{name}/{MANIFEST}')
+    directory = os.path.dirname(manifest_path)
+    for part in load_manifest(directory)['parts']:
+        fetch_blob(bucket, f"{name}/{part['file']}")
+    return directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert a dashboard CSV dataset to typed Parquet.')
+    parser.add_argument('csv_path')
+    parser.add_argument('parquet_path', nargs='?')
+    args = parser.parse_args(argv)
+    print(convert_csv(args.csv_path, args.parquet_path or to_parquet_path(args.csv_path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""Paginated access to a dataset, so only the rows on screen are serialized."""
+import numpy as np
+
+
+def filter_mask(data, filters=None):
+    # filters : {column: allowed values}, an empty selection keeps every row
+    mask = np.ones(len(data), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= data[column].isin(values).to_numpy()
+    return mask
+
+
+def page_count(total_rows, page_size):
+    return max(1, -(-total_rows // page_size))
+
+
+def page_slice(data, page, page_size, filters=None, columns=None, sort_by=None, ascending=True):
+    # returns the rows of page `page` (starting at 1) and the number of rows matching the filters
+    positions = np.flatnonzero(filter_mask(data, filters))
+    if sort_by is not None:
+        values = data[sort_by].iloc[positions].reset_index(drop=True)
+        positions = positions[values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()]
+    start = (page - 1) * page_size
+    rows = data.iloc[positions[start:start + page_size]]
+    return (rows if columns is None else rows[columns]), len(positions)
@@ -0,0 +1,70 @@
+"""Local stand-in for the pricing API `predict` endpoint.
+
+Answers with a simple linear price so tests and local runs don't depend on
+the real API. Requests are counted in `requests_served`.
+
+    python -m analytics.predict_stub --port 8000
+"""
+import argparse
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from analytics.cube import OPTIONS
+from analytics.predictions import FEATURES
+
+
+def stub_price(row):
+    car = dict(zip(FEATURES, row))
+    options = sum(bool(car.get(option)) for option in OPTIONS)
+    return round(60 + 0.45 * car['engine_power'] - car['mileage'] / 10000 + 4 * options, 2)
+
+
+class PredictHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path.rstrip('/') != '/predict':
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        payload = json.dumps({'prediction': [stub_price(row) for row in body['input']]}).encode()
+        self.server.requests_served += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), PredictHandler)
+    server.requests_served = 0
+    return server
+
+
+@contextmanager
+def running_stub():
+    # yields the server, its predict url is f'http://127.0.0.1:{server.server_port}/predict'
+    server = make_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+    make_server(args.host, args.port).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Batch client for the `predict` endpoint of the Getaround pricing API.
+
+Cars are sent in batches from one pooled async HTTP client, with a bounded
+number of requests in flight and retries with exponential backoff. Results
+are cached on disk keyed by a hash of the feature row, in one file per
+endpoint and model version, so only new or changed cars are sent again and a
+stub or a new model never answers from another one's predictions.
+
+The endpoint takes `{"input": [[feature values], ...]}` with the features in
+FEATURES order and answers `{"prediction": [price, ...]}`. It takes no null
+values, cars with a missing feature are rejected before anything is sent.
+`analytics.predict_stub` serves the same contract locally for tests.
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+import httpx
+import pandas as pd
+
+from analytics.schema import PRICING_SCHEMA
+from analytics.storage import CACHE_DIR, atomic_write
+
+PREDICT_URL = os.environ.get('GETAROUND_PREDICT_URL', 'https://getaround-api-p5.herokuapp.com/predict')
+FEATURES = [column for column in PRICING_SCHEMA if column != 'rental_price_per_day']
+# bump (or set GETAROUND_MODEL_VERSION) when the model behind the endpoint changes
+MODEL_VERSION = os.environ.get('GETAROUND_MODEL_VERSION', '1')
+
+BATCH_SIZE = 500
+CONCURRENCY = 8
+RETRIES = 4
+BACKOFF = 0.5  # seconds, doubled after each failed attempt
+TIMEOUT = 30
+
+
+def feature_rows(cars):
+    # plain Python values, in the order expected by the API
+    missing = cars[FEATURES].isna()
+    if missing.any(axis=None):
+        columns = ', '.join(missing.columns[missing.any()])
+        raise ValueError(f'{int(missing.any(axis=1).sum())} cars with missing features ({columns})')
+    return cars[FEATURES].to_dict(orient='split')['data']
+
+
+def row_key(row):
+    return hashlib.sha1(json.dumps(row).encode()).hexdigest()
+
+
+def cache_path_for(url=PREDICT_URL, model_version=MODEL_VERSION):
+    digest = hashlib.sha1(f'{url}|{model_version}'.encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, 'predictions', f'{digest}.json')
+
+
+def load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path, 'w') as f:
+        json.dump(cache, f)
+
+
+async def _post_batch(client, semaphore, url, rows):
+    async with semaphore:
+        for attempt in range(RETRIES + 1):
+            try:
+                response = await client.post(url, json={'input': rows})
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    prediction = response.json()['prediction']
+                    if len(prediction) != len(rows):
+                        raise ValueError(f'{len(prediction)} predictions for {len(rows)} cars from {url}')
+                    return prediction
+                error = httpx.HTTPStatusError(f'{response.status_code} from {url}', request=response.request, response=response)
+            except httpx.TransportError as exc:
+                error = exc
+            if attempt == RETRIES:
+                raise error
+            await asyncio.sleep(BACKOFF * 2 ** attempt)
+
+
+async def predict_rows(rows, url=PREDICT_URL, batch_size=BATCH_SIZE, concurrency=CONCURRENCY):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=TIMEOUT) as client:
+        batches = [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)]
+        results = await asyncio.gather(*[_post_batch(client, semaphore, url, batch) for batch in batches])
+    return [prediction for batch in results for prediction in batch]
+
+
+def predict_prices(cars, url=PREDICT_URL, cache_path=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                   model_version=MODEL_VERSION):
+    # predicted rental price per day for every car, aligned on the cars index
+    # cache_path defaults to one file per endpoint and model version, see cache_path_for
+    if cache_path is None:
+        cache_path = cache_path_for(url, model_version)
+    rows = feature_rows(cars)
+    keys = [row_key(row) for row in rows]
+    cache = load_cache(cache_path)
+    missing = {key: row for key, row in zip(keys, rows) if key not in cache}
+    if missing:
+        predictions = asyncio.run(predict_rows(list(missing.values()), url, batch_size, concurrency))
+        cache.update(zip(missing, predictions))
+        save_cache(cache, cache_path)
+    return pd.Series([cache[key] for key in keys], index=cars.index, name='predicted_price_per_day')
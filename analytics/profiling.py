@@ -0,0 +1,112 @@
+"""Wall time, CPU time and allocated memory per named section of a page run.
+
+Sections are delimited with `mark`, each call closing the previous section,
+so a page script only needs one line per section. Memory is traced with
+tracemalloc when `trace_memory` is set, as it slows the whole process down.
+
+Streamlit runs every session in a thread of the same process : CPU time is the
+time of the calling thread, and tracemalloc runs while at least one profiler
+traces memory. tracemalloc is process wide, so allocated memory is exact for a
+single traced session and includes the allocations of the others otherwise.
+
+Each run is appended as a JSON line to `profile.jsonl`, rotated to
+`profile.jsonl.1` past MAX_LOG_BYTES, and the latest run of a page is written
+in Prometheus text format to `<page>.prom` (node exporter textfile
+collector), both in PROFILE_DIR.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+
+from analytics.storage import atomic_write
+
+PROFILE_DIR = os.environ.get('GETAROUND_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'getaround_profile'))
+MAX_LOG_BYTES = 10 * 2**20
+
+# number of running profilers tracing memory, tracemalloc is stopped with the last one
+_tracing = 0
+_tracing_lock = threading.Lock()
+
+
+def _start_tracing():
+    global _tracing
+    with _tracing_lock:
+        if _tracing == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing += 1
+
+
+def _stop_tracing():
+    global _tracing
+    with _tracing_lock:
+        _tracing -= 1
+        if _tracing == 0:
+            tracemalloc.stop()
+
+
+class Profiler:
+    def __init__(self, page, trace_memory=False):
+        self.page = page
+        self.trace_memory = trace_memory
+        self.sections = []
+        self._current = None
+        if trace_memory:
+            _start_tracing()
+            # also released when an interrupted rerun never reaches finish
+            self._release = weakref.finalize(self, _stop_tracing)
+
+    def mark(self, name):
+        self._close()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self._current = (name, time.perf_counter(), time.thread_time(),
+                         tracemalloc.get_traced_memory()[0] if self.trace_memory else 0)
+
+    def _close(self):
+        if self._current is None:
+            return
+        name, wall, cpu, memory = self._current
+        self.sections.append({
+            'section': name,
+            'wall_seconds': time.perf_counter() - wall,
+            'cpu_seconds': time.thread_time() - cpu,
+            # peak memory allocated on top of what was held when the section started,
+            # another session may have reset the peak in between
+            'allocated_bytes': max(tracemalloc.get_traced_memory()[1] - memory, 0) if self.trace_memory else None,
+        })
+        self._current = None
+
+    def finish(self):
+        self._close()
+        if self.trace_memory:
+            self._release()
+        return self.sections
+
+    def prometheus_text(self):
+        lines = []
+        for metric, key, help_text in [
+            ('getaround_section_wall_seconds', 'wall_seconds', 'Wall time of the page section'),
+            ('getaround_section_cpu_seconds', 'cpu_seconds', 'CPU time of the page section'),
+            ('getaround_section_allocated_bytes', 'allocated_bytes', 'Peak memory allocated in the page section'),
+        ]:
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+            lines += [f'{metric}{{page="{self.page}",section="{section["section"]}"}} {section[key]}'
+                      for section in self.sections if section[key] is not None]
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory=PROFILE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        log_path = os.path.join(directory, 'profile.jsonl')
+        try:
+            if os.path.getsize(log_path) > MAX_LOG_BYTES:
+                os.replace(log_path, log_path + '.1')
+        except OSError:
+            pass
+        with open(log_path, 'a') as f:
+            f.write(json.dumps({'page': self.page, 'time': time.time(), 'sections': self.sections}) + '\n')
+        with atomic_write(os.path.join(directory, f'{self.page}.prom'), 'w') as f:
+            f.write(self.prometheus_text())
@@ -0,0 +1,132 @@
+"""Dashboard results as plain Python structures, without Streamlit.
+
+`delay_report` and `pricing_report` return the figures quoted on the pages for
+one dataset, `run_reports` computes them for many datasets in a process pool.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analytics.aggregates import delay_metrics, pricing_metrics, share
+from analytics.ingest import read_columns, read_parts
+from analytics.revenue import risk_over_revenue_above
+from analytics.thresholds import impact_curves
+
+MEDIAN_RENTAL = 119  # median rental price per day
+PENALTY = 3  # penalty for late arrival, as a multiple of the normal minute rate
+SHORT_RENTAL_HOURS = 5.86  # average duration of canceled rentals under which late revenue covers the max loss
+MINUTES_PER_DAY = 1440
+
+USER_THRESHOLDS = np.arange(0, 60*12, step=15)
+BUSINESS_THRESHOLDS = np.arange(0, 60*24, step=15)
+
+
+def exploration_summary(metrics):
+    impacted_30 = impact_curves(metrics['impact_index'], [30])['impacted_total'][0]
+    return {
+        'rentals': metrics['rentals'],
+        'mobile_share': share(metrics['checkin_counts'], 'mobile'),
+        'connect_share': share(metrics['checkin_counts'], 'connect'),
+        'connect_canceled_share': share(metrics['canceled_checkin_counts'], 'connect'),
+        'canceled_share': share(metrics['state_counts'], 'canceled'),
+        'percentage_drivers_late': metrics['late_count'] / metrics['rentals'] * 100,
+        'time_late': metrics['late_minutes'] / metrics['late_count'] if metrics['late_count'] else 0.0,
+        'issues': metrics['issues'],
+        'issues_percentage': metrics['issues'] / metrics['rentals'] * 100,
+        'issues_over_30': metrics['issues_over_30'],
+        'impacted_30': int(impacted_30),
+    }
+
+
+def business_summary(metrics, median_rental=MEDIAN_RENTAL):
+    # max loss, late revenue and max risk assuming 24 hour rentals at the median price
+    canceled = int(metrics['state_counts'].get('canceled', 0))
+    ended = int(metrics['state_counts'].get('ended', 0))
+    minute_rate = median_rental / MINUTES_PER_DAY
+    canceled_loss = canceled * median_rental
+    late_revenue = metrics['late_minutes'] * minute_rate
+    at_risk = metrics['late_count'] * minute_rate * MINUTES_PER_DAY
+    revenue = ended * median_rental + late_revenue
+    return {
+        'canceled': canceled,
+        'ended': ended,
+        'minute_rate': minute_rate,
+        'canceled_loss': canceled_loss,
+        'number_delays': metrics['late_count'],
+        'late_revenue': late_revenue,
+        'late_loss': canceled_loss - late_revenue,
+        'break_even_hours': late_revenue / canceled_loss * 24 if canceled_loss else float('nan'),
+        'at_risk': at_risk,
+        'revenue': revenue,
+        'risk_over_revenue': at_risk / revenue if revenue else float('nan'),
+    }
+
+
+def _to_builtin(value):
+    if isinstance(value, dict):
+        return {str(key): _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def delay_report(data, median_rental=MEDIAN_RENTAL, penalty=PENALTY,
+                 user_thresholds=USER_THRESHOLDS, business_thresholds=BUSINESS_THRESHOLDS):
+    metrics = delay_metrics(data)
+    business = business_summary(metrics, median_rental)
+    return _to_builtin({
+        'exploration': exploration_summary(metrics),
+        'business': business,
+        'user_thresholds': user_thresholds,
+        'impact_curves': impact_curves(metrics['impact_index'], user_thresholds),
+        'business_thresholds': business_thresholds,
+        'risk_over_revenue_penalty': risk_over_revenue_above(
+            metrics['delay_index'], business_thresholds, median_rental, business['minute_rate'], penalty),
+    })
+
+
+def pricing_report(data):
+    metrics = pricing_metrics(data)
+    return _to_builtin({
+        'rentals': len(data),
+        'mean_price_per_brand': metrics['models_mean']['rental_price_per_day'].to_dict(),
+        'total_price_per_brand': metrics['models_sum']['rental_price_per_day'].to_dict(),
+        'price_correlations': metrics['corr']['rental_price_per_day'].drop('rental_price_per_day').to_dict(),
+    })
+
+
+REPORTS = {'delay': delay_report, 'pricing': pricing_report}
+
+
+def _run_one(kind, path):
+    start = time.perf_counter()
+    # dataset directories (see analytics.ingest) carry next rental flags in their manifest
+    if os.path.isdir(path):
+        data = read_parts(path)
+    else:
+        data = pd.read_csv(path) if path.endswith('.csv') else read_columns(path)
+    report = REPORTS[kind](data)
+    return {'path': path, 'seconds': time.perf_counter() - start, 'report': report}
+
+
+def run_reports(kind, paths, workers=None):
+    # one report per dataset, computed in parallel processes (workers=1 runs them in this process)
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_run_one(kind, path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = list(pool.map(_run_one, [kind] * len(paths), paths))
+    elapsed = time.perf_counter() - start
+    return {
+        'kind': kind,
+        'datasets': len(paths),
+        'seconds': elapsed,
+        'datasets_per_second': len(paths) / elapsed if elapsed else float('nan'),
+        'results': results,
+    }
@@ -0,0 +1,58 @@
+"""Late revenue and late risk for any threshold from one sorted delay index.
+
+Delays are sorted once and suffix counts/sums are kept alongside, so the
+amount and number of delays above a threshold are O(1) lookups after a
+binary search, for a single threshold or a whole grid.
+"""
+import numpy as np
+
+
+def build_delay_index(delays):
+    # delays : checkout delays in minutes (`delays_checkout_min_cleaned`), NaN are ignored
+    values = np.asarray(delays, dtype=float)
+    return _with_suffixes(np.sort(values[~np.isnan(values)]))
+
+
+def _with_suffixes(values):
+    suffix_sum = np.zeros(len(values) + 1)
+    suffix_sum[:-1] = np.cumsum(values[::-1])[::-1]
+    return {
+        'values': values,
+        'suffix_sum': suffix_sum,
+        'suffix_count': np.arange(len(values), -1, -1),
+    }
+
+
+def _position(index, threshold):
+    # first delay strictly above the threshold
+    return np.searchsorted(index['values'], threshold, side='right')
+
+
+def count_above(index, threshold):
+    return index['suffix_count'][_position(index, threshold)]
+
+
+def minutes_above(index, threshold):
+    return index['suffix_sum'][_position(index, threshold)]
+
+
+def revenue_above(index, threshold, minute_rate, penalty=1):
+    # revenue from the minutes of delays above the threshold, billed at penalty x minute rate
+    return minutes_above(index, threshold) * minute_rate * penalty
+
+
+def risk_above(index, threshold, median_rental):
+    # every delay above the threshold costs the next rental
+    return count_above(index, threshold) * median_rental
+
+
+def risk_over_revenue_above(index, threshold, median_rental, minute_rate, penalty=1):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return risk_above(index, threshold, median_rental) / revenue_above(index, threshold, minute_rate, penalty)
+
+
+def merge_delay_index(index, new_delays):
+    # inserts new delays in the sorted values without sorting the history again
+    new_values = np.asarray(new_delays, dtype=float)
+    new_values = np.sort(new_values[~np.isnan(new_values)])
+    return _with_suffixes(np.insert(index['values'], np.searchsorted(index['values'], new_values), new_values))
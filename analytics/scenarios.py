@@ -0,0 +1,92 @@
+"""What-if grid over penalty, rental duration, median price and threshold.
+
+The late counts and late minutes above each threshold come from the sorted
+delay index once, then the max loss, late revenue and risk formulas of the
+Delay page are evaluated as broadcast NumPy operations over the whole grid.
+Large grids can be split over a process pool along the penalty axis. The
+grid is evaluated in chunks of penalties, so `timeout` is checked between
+chunks in process and the pool workers are terminated when it expires.
+Every axis needs at least one value.
+"""
+import multiprocessing
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.report import MINUTES_PER_DAY
+from analytics.revenue import count_above, minutes_above
+
+AXES = ['penalty', 'rental_hours', 'median_rental', 'threshold']
+
+
+def _evaluate(count, minutes, canceled, penalties, rental_hours, median_rentals, thresholds, target_ratio):
+    penalty = np.asarray(penalties, dtype=float)[:, None, None, None]
+    hours = np.asarray(rental_hours, dtype=float)[None, :, None, None]
+    price = np.asarray(median_rentals, dtype=float)[None, None, :, None]
+    shape = (penalty.shape[0], hours.shape[1], price.shape[2], len(thresholds))
+
+    rental_price = price * hours / 24  # price of a canceled rental lasting `rental_hours`
+    late_revenue = np.broadcast_to(minutes * price / MINUTES_PER_DAY * penalty, shape)
+    late_risk = np.broadcast_to(count * rental_price, shape)
+    max_loss = np.broadcast_to(canceled * rental_price, shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk_over_revenue = late_risk / late_revenue
+
+    grid = np.meshgrid(penalties, rental_hours, median_rentals, thresholds, indexing='ij')
+    table = pd.DataFrame({axis: values.ravel() for axis, values in zip(AXES, grid)})
+    table['max_loss'] = max_loss.ravel()
+    table['late_revenue'] = late_revenue.ravel()
+    table['late_risk'] = late_risk.ravel()
+    table['risk_over_revenue'] = risk_over_revenue.ravel()
+
+    # best threshold : the lowest one where late revenue covers the risk of late checkouts
+    covered = risk_over_revenue <= target_ratio
+    first = covered.argmax(axis=-1)
+    best = pd.DataFrame({axis: values[..., 0].ravel() for axis, values in zip(AXES[:-1], grid)})
+    best['best_threshold'] = np.where(covered.any(axis=-1), np.asarray(thresholds, dtype=float)[first], np.nan).ravel()
+    best['risk_over_revenue'] = np.take_along_axis(risk_over_revenue, first[..., None], axis=-1).ravel()
+    best.loc[best['best_threshold'].isna(), 'risk_over_revenue'] = np.nan
+    return table, best
+
+
+def evaluate_scenarios(index, canceled, penalties, rental_hours, median_rentals, thresholds,
+                       target_ratio=1.0, workers=1, timeout=None):
+    # index : analytics.revenue.build_delay_index output, canceled : number of canceled rentals
+    # returns the tidy table of every grid cell and the best threshold per scenario
+    empty = [axis for axis, values in zip(AXES, (penalties, rental_hours, median_rentals, thresholds)) if not len(values)]
+    if empty:
+        raise ValueError(f'no value to evaluate for {", ".join(empty)}')
+    thresholds = np.asarray(thresholds)
+    count = count_above(index, thresholds).astype(float)
+    minutes = minutes_above(index, thresholds)
+    penalties = np.asarray(penalties, dtype=float)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if workers == 1:
+        results = []
+        for chunk in np.array_split(penalties, len(penalties)):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f'scenario grid not evaluated within {timeout}s')
+            results.append(_evaluate(count, minutes, canceled, chunk, rental_hours, median_rentals, thresholds,
+                                     target_ratio))
+    else:
+        results = _evaluate_in_pool(count, minutes, canceled, penalties, rental_hours, median_rentals, thresholds,
+                                    target_ratio, workers, timeout)
+    return (pd.concat([table for table, _ in results], ignore_index=True),
+            pd.concat([best for _, best in results], ignore_index=True))
+
+
+def _evaluate_in_pool(count, minutes, canceled, penalties, rental_hours, median_rentals, thresholds, target_ratio,
+                      workers, timeout):
+    # terminated rather than closed : the workers may still be running after a timeout
+    chunks = [chunk for chunk in np.array_split(penalties, workers) if len(chunk)]
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = pool.starmap_async(_evaluate, [(count, minutes, canceled, chunk, rental_hours, median_rentals,
+                                                  thresholds, target_ratio) for chunk in chunks])
+        try:
+            return results.get(timeout)
+        except multiprocessing.TimeoutError:
+            raise TimeoutError(f'scenario grid not evaluated within {timeout}s') from None
+    finally:
+        pool.terminate()
@@ -0,0 +1,81 @@
+"""Declared dtypes of both datasets.
+
+Strings are categoricals, numerics are downcast to the smallest type holding
+their range, ids that can be missing are nullable ints and option flags are
+bools. Delays and time deltas stay floats (float32) since the threshold
+indexes read them as NumPy arrays with NaN for missing values.
+
+Bools are parsed from the known spellings of true and false only : any other
+value, missing ones included, raises instead of silently becoming True.
+"""
+import pandas as pd
+
+DELAY_SCHEMA = {
+    'rental_id': 'int32',
+    'car_id': 'int32',
+    'checkin_type': 'category',
+    'state': 'category',
+    'delay_at_checkout_in_minutes': 'float32',
+    'previous_ended_rental_id': 'Int32',
+    'time_delta_with_previous_rental_in_minutes': 'float32',
+    'checkout': 'category',
+    'next_rental': 'bool',
+    'delays_checkout_min_cleaned': 'float32',
+}
+
+PRICING_SCHEMA = {
+    'model_key': 'category',
+    'mileage': 'int32',
+    'engine_power': 'int16',
+    'fuel': 'category',
+    'paint_color': 'category',
+    'car_type': 'category',
+    'private_parking_available': 'bool',
+    'has_gps': 'bool',
+    'has_air_conditioning': 'bool',
+    'automatic_car': 'bool',
+    'has_getaround_connect': 'bool',
+    'has_speed_regulator': 'bool',
+    'winter_tires': 'bool',
+    'rental_price_per_day': 'int16',
+}
+
+SCHEMA = {**DELAY_SCHEMA, **PRICING_SCHEMA}
+
+
+TRUE_VALUES = {True, 1, 'true', 'yes', '1'}
+FALSE_VALUES = {False, 0, 'false', 'no', '0'}
+
+
+def to_bool(values):
+    if pd.api.types.is_bool_dtype(values) and not values.hasnans:
+        return values.astype('bool')
+    keys = values.map(lambda value: value.strip().lower() if isinstance(value, str) else value).astype(object)
+    mapped = keys.map(lambda value: True if value in TRUE_VALUES else False if value in FALSE_VALUES else None)
+    unknown = mapped.isna()
+    if unknown.any():
+        raise ValueError(f'{values.name} : {unknown.sum()} values are neither true nor false, '
+                         f'such as {values[unknown].unique()[:5].tolist()}')
+    return mapped.astype('bool')
+
+
+def apply_schema(data, schema=SCHEMA):
+    # columns missing from the schema are left unchanged
+    dtypes = {column: dtype for column, dtype in schema.items() if column in data.columns}
+    bools = [column for column, dtype in dtypes.items() if dtype == 'bool' and not pd.api.types.is_bool_dtype(data[column])]
+    if bools:
+        data = data.assign(**{column: to_bool(data[column]) for column in bools})
+    return data.astype(dtypes)
+
+
+def memory_report(data, schema=SCHEMA):
+    # bytes used per column with the current dtypes and once the schema is applied
+    compact = apply_schema(data, schema)
+    report = pd.DataFrame({
+        'dtype': data.dtypes.astype(str),
+        'compact_dtype': compact.dtypes.astype(str),
+        'bytes': data.memory_usage(index=False, deep=True),
+        'compact_bytes': compact.memory_usage(index=False, deep=True),
+    })
+    report.loc['total'] = ['', '', report['bytes'].sum(), report['compact_bytes'].sum()]
+    return report
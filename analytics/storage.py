@@ -0,0 +1,121 @@
+"""Local on-disk cache in front of the Google Cloud Storage bucket.
+
+Blobs are streamed in chunks to `cache_dir` next to a small metadata file
+holding their generation and ETag. A later fetch only checks the blob
+metadata and downloads again when it changed, and the cached copy is served
+when the bucket can't be reached. A blob missing from the bucket raises
+`BlobNotFound`, even when a copy is cached.
+
+`LocalBucket` is a filesystem-backed stand-in for `storage.Bucket`, for tests
+and local development.
+"""
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# per user, the caches hold pickles that must not be writable by other users of the box
+CACHE_DIR = os.environ.get('GETAROUND_CACHE_DIR', os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'getaround'))
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class BlobNotFound(LookupError):
+    # the bucket answered but doesn't hold the blob, the cached copy is not served
+    pass
+
+
+def unreachable_errors():
+    # imported on first failed fetch, the pages don't load the Google client libraries up front
+    # GoogleAuthError covers the token refresh failing while offline
+    try:
+        from google.api_core.exceptions import GoogleAPIError, NotFound
+        from google.auth.exceptions import GoogleAuthError
+    except ImportError:
+        return (OSError,), ()
+    return (OSError, GoogleAPIError, GoogleAuthError), (NotFound,)
+
+
+class LocalBlob:
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        stat = os.stat(path)
+        self.generation = stat.st_mtime_ns
+        self.etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+    def open(self, mode='rb', chunk_size=None):
+        return open(self.path, mode)
+
+
+class LocalBucket:
+    def __init__(self, root, name=None):
+        self.root = root
+        self.name = name or os.path.basename(os.path.normpath(root))
+
+    def get_blob(self, blob_name):
+        path = os.path.join(self.root, blob_name)
+        return LocalBlob(path, blob_name) if os.path.isfile(path) else None
+
+
+def _read_metadata(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def atomic_write(path, mode='wb'):
+    # written to a unique temporary file of the same directory then renamed, so readers never see a
+    # partial file and concurrent writers (server processes or session threads) never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.part')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _download(blob, path, chunk_size):
+    with atomic_write(path) as out, blob.open('rb', chunk_size=chunk_size) as source:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            out.write(chunk)
+
+
+def fetch_blob(bucket, blob_name, cache_dir=CACHE_DIR, chunk_size=CHUNK_SIZE):
+    # returns the path of an up to date local copy of the blob
+    path = os.path.join(cache_dir, bucket.name, blob_name)
+    meta_path = path + '.meta.json'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cached = _read_metadata(meta_path) if os.path.isfile(path) else None
+
+    try:
+        blob = bucket.get_blob(blob_name)
+        if blob is None:
+            raise BlobNotFound(f'{blob_name} not found in bucket {bucket.name}')
+        metadata = {'generation': blob.generation, 'etag': blob.etag}
+        if cached == metadata:
+            return path
+        _download(blob, path, chunk_size)
+    except Exception as exc:
+        unreachable, not_found = unreachable_errors()
+        if isinstance(exc, not_found):
+            raise BlobNotFound(f'{blob_name} not found in bucket {bucket.name}') from exc
+        if cached is None or not isinstance(exc, unreachable):
+            raise
+        logger.warning('Bucket %s unreachable, serving cached %s', bucket.name, blob_name, exc_info=True)
+        return path
+
+    with atomic_write(meta_path, 'w') as f:
+        json.dump(metadata, f)
+    return path
@@ -0,0 +1,49 @@
+"""Impacted/solved curves for a minimum delay between two rentals.
+
+The sorted arrays are built once per checkin type, so every threshold of the
+grid is answered with a binary search instead of refiltering the rentals.
+"""
+import numpy as np
+
+CHECKIN_TYPES = ('connect', 'mobile')
+
+
+def _sorted_values(values):
+    return np.sort(values[~np.isnan(values)])
+
+
+def build_impact_index(impacted_df):
+    # impacted_df : rentals with a previous rental, holding the `difference` column
+    # (time delta with previous rental minus cleaned checkout delay)
+    # rows are selected with boolean masks over the columns, no filtered frame is built
+    time_delta = impacted_df['time_delta_with_previous_rental_in_minutes'].to_numpy(dtype=float)
+    delay = impacted_df['delay_at_checkout_in_minutes'].to_numpy(dtype=float)
+    solved = (impacted_df['difference'] < 0).to_numpy()
+    index = {'total': {'impacted': _sorted_values(time_delta), 'solved': _sorted_values(delay[solved])}}
+    for checkin_type in CHECKIN_TYPES:
+        rows = (impacted_df['checkin_type'] == checkin_type).to_numpy()
+        index[checkin_type] = {
+            'impacted': _sorted_values(time_delta[rows]),
+            'solved': _sorted_values(delay[rows & solved]),
+        }
+    return index
+
+
+def impact_curves(index, threshold_range):
+    # Number of rentals strictly under each threshold, same as the `< t` filters
+    thresholds = np.asarray(threshold_range, dtype=float)
+    curves = {}
+    for name, values in index.items():
+        curves[f'impacted_{name}'] = np.searchsorted(values['impacted'], thresholds, side='left')
+        curves[f'solved_{name}'] = np.searchsorted(values['solved'], thresholds, side='left')
+    return curves
+
+
+def merge_impact_index(index, new_impacted_df):
+    # inserts the rentals of a new batch in the sorted arrays of an existing index
+    new_index = build_impact_index(new_impacted_df)
+    for name, arrays in index.items():
+        for key, values in arrays.items():
+            new_values = new_index[name][key]
+            arrays[key] = np.insert(values, np.searchsorted(values, new_values), new_values)
+    return index
@@ -0,0 +1,55 @@
+"""Boot-time warm-up of the dashboard.
+
+Run before the server starts, it fills the local dataset copies and the disk
+caches of analytics.cache, so the first visitor only loads them, then removes
+every cached entry the pages no longer use.
+
+    python -m analytics.warmup --credentials service_account.json
+    python -m analytics.warmup --local path/to/bucket_copy
+"""
+import argparse
+import time
+
+from analytics.cache import (BUCKET_NAME, DATASETS, cached_figure, cached_metrics, figure_path, load_page,
+                             metrics_path, prune)
+from analytics.figures import page_figures
+
+
+def warm_up(bucket, pages=tuple(DATASETS)):
+    timings = {}
+    keep = set()
+    for page in pages:
+        start = time.perf_counter()
+        data, version = load_page(bucket, page)
+        metrics = cached_metrics(page, version, data)
+        keep.add(metrics_path(page, version))
+        for name, (params, build) in page_figures(page, metrics).items():
+            key = (name, version) + params
+            cached_figure(key, build)
+            keep.add(figure_path(key))
+        timings[page] = time.perf_counter() - start
+    if set(pages) == set(DATASETS):
+        prune(keep)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prefetch the datasets and precompute aggregates and figures.')
+    parser.add_argument('--credentials', help='service account JSON file, default credentials otherwise')
+    parser.add_argument('--local', help='directory standing in for the bucket')
+    args = parser.parse_args(argv)
+
+    if args.local:
+        from analytics.storage import LocalBucket
+        bucket = LocalBucket(args.local, BUCKET_NAME)
+    else:
+        from google.cloud import storage
+        client = (storage.Client.from_service_account_json(args.credentials) if args.credentials
+                  else storage.Client())
+        bucket = client.bucket(BUCKET_NAME)
+    for page, seconds in warm_up(bucket).items():
+        print(f'{page} warmed up in {seconds:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
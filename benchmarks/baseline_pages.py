@@ -0,0 +1,147 @@
+"""The pages as they were before the analytics package, without Streamlit.
+
+Same computations and figures as the original Delay.py and pages/Pricing.py
+scripts : a storage client built on every request, the CSV downloaded as a
+string and decoded, the threshold loops over filtered frames and the seaborn
+figures. Figures are rendered to PNG like `st.pyplot` does, the sunburst is
+serialized like `st.plotly_chart` does. Texts are left out.
+
+pandas no longer drops non-numeric columns in `groupby().mean()` and
+`corr()`, `numeric_only=True` keeps the previous behaviour.
+"""
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import seaborn as sns
+
+MEDIAN_RENTAL = 119
+PENALTY = 3
+
+
+def storage_client():
+    # the pages built a client from the service account on every run, anonymous here to stay offline
+    try:
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import storage
+    except ImportError:
+        return None
+    return storage.Client(project='getaround', credentials=AnonymousCredentials())
+
+
+def read_file(bucket, file_path):
+    with bucket.get_blob(file_path).open('rb') as f:
+        return f.read().decode('utf-8')  # same as blob.download_as_string().decode('utf-8')
+
+
+def _png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def delay_page(data):
+    figures = []
+    checkout_clean = data.dropna(subset=['delay_at_checkout_in_minutes'])
+    checktype_checkout = checkout_clean.groupby(['checkin_type', 'checkout']).size().reset_index(name='count')
+    checktype_checkout['percentage'] = [i / checktype_checkout['count'].sum() * 100 for i in checktype_checkout['count']]
+    fig = plt.figure(figsize=(10, 6))
+    sns.barplot(y=checktype_checkout['percentage'], x=checktype_checkout['checkin_type'], hue=checktype_checkout['checkout'])
+    figures.append(_png(fig))
+
+    has_next = data.groupby(['checkin_type', 'next_rental']).size().reset_index(name='count')
+    has_next['percentage'] = [i / has_next['count'].sum() * 100 for i in has_next['count']]
+    fig = plt.figure(figsize=(10, 6))
+    sns.barplot(y=has_next['percentage'], x=has_next['checkin_type'], hue=has_next['next_rental'])
+    figures.append(_png(fig))
+
+    for column in ('time_delta_with_previous_rental_in_minutes', 'delays_checkout_min_cleaned'):
+        fig = plt.figure(figsize=(10, 6))
+        sns.histplot(data=data, x=column)
+        figures.append(_png(fig))
+
+    impacted_df = data.dropna(subset=['time_delta_with_previous_rental_in_minutes'])
+    impacted_df['difference'] = impacted_df['time_delta_with_previous_rental_in_minutes'] - impacted_df['delays_checkout_min_cleaned']
+    threshold_range = np.arange(0, 60*12, step=15)
+    curves = {key: [] for key in ('impacted_connect', 'impacted_mobile', 'impacted_total',
+                                  'solved_connect', 'solved_mobile', 'solved_total')}
+    for t in threshold_range:
+        impacted = impacted_df.dropna(subset=['time_delta_with_previous_rental_in_minutes'])
+        connect_impact = impacted[impacted['checkin_type'] == 'connect']
+        mobile_impact = impacted[impacted['checkin_type'] == 'mobile']
+        curves['impacted_connect'].append(len(connect_impact[connect_impact['time_delta_with_previous_rental_in_minutes'] < t]))
+        curves['impacted_mobile'].append(len(mobile_impact[mobile_impact['time_delta_with_previous_rental_in_minutes'] < t]))
+        curves['impacted_total'].append(len(impacted[impacted['time_delta_with_previous_rental_in_minutes'] < t]))
+        solved = impacted_df[impacted_df['difference'] < 0]
+        connect_solved = solved[solved['checkin_type'] == 'connect']
+        mobile_solved = solved[solved['checkin_type'] == 'mobile']
+        curves['solved_connect'].append(len(connect_solved[connect_solved['delay_at_checkout_in_minutes'] < t]))
+        curves['solved_mobile'].append(len(mobile_solved[mobile_solved['delay_at_checkout_in_minutes'] < t]))
+        curves['solved_total'].append(len(solved[solved['delay_at_checkout_in_minutes'] < t]))
+    fig, ax = plt.subplots(1, 2, sharex=True, figsize=(20, 7))
+    for key, values in curves.items():
+        ax[0 if key.startswith('solved') else 1].plot(threshold_range, values)
+    figures.append(_png(fig))
+
+    canceled_loss = (data['state'] == 'canceled').sum() * MEDIAN_RENTAL
+    minute_rate = MEDIAN_RENTAL / 1440
+    threshold_range = np.arange(0, 60*24, step=15)
+    total_late_revenue = []
+    for i in threshold_range:
+        total_late_revenue.append(data[data['delays_checkout_min_cleaned'] > i]['delays_checkout_min_cleaned'].sum() * minute_rate)
+    total_late_revenue.reverse()
+    fig, ax = plt.subplots(1, 2, sharex=True, figsize=(15, 6))
+    ax[0].plot(threshold_range / 60, total_late_revenue)
+    ax[0].hlines(y=canceled_loss / 24 * 5.86, xmin=0, xmax=24, linewidth=2, color='r')
+    ax[1].plot(threshold_range / 60, total_late_revenue)
+    ax[1].hlines(y=canceled_loss, xmin=0, xmax=24, linewidth=2, color='r')
+    figures.append(_png(fig))
+
+    risk_over_revenue_penalty = []
+    for t in threshold_range:
+        count = (data['delays_checkout_min_cleaned'] > t).sum()
+        late_revenue_penalty = data[data['delays_checkout_min_cleaned'] > t]['delays_checkout_min_cleaned'].sum() * minute_rate * PENALTY
+        risk_over_revenue_penalty.append(count * MEDIAN_RENTAL / late_revenue_penalty)
+    fig = plt.figure(figsize=(12, 7))
+    sns.lineplot(x=threshold_range, y=risk_over_revenue_penalty)
+    figures.append(_png(fig))
+    return figures
+
+
+def pricing_page(data):
+    figures = []
+    fig = px.sunburst(data, path=['model_key', 'car_type'], values='rental_price_per_day', width=1000, height=800)
+    figures.append(fig.to_json())
+
+    models_df = data.groupby('model_key').mean(numeric_only=True).sort_values(by='rental_price_per_day', ascending=False)
+    fig = plt.figure(figsize=(10, 6))
+    sns.barplot(x=models_df.index, y=models_df['rental_price_per_day'])
+    figures.append(_png(fig))
+    models2_df = data.groupby('model_key').sum(numeric_only=True).sort_values('rental_price_per_day', ascending=False)
+    fig = plt.figure(figsize=(10, 6))
+    sns.barplot(x=models2_df.index, y=models2_df['rental_price_per_day'])
+    figures.append(_png(fig))
+
+    fig = plt.figure(figsize=(12, 7))
+    corr_mx = data.corr(numeric_only=True)
+    sns.heatmap(corr_mx, mask=np.triu(corr_mx), annot=True, cmap='YlGnBu', linewidths=0.1, square=True)
+    figures.append(_png(fig))
+
+    for column in ('rental_price_per_day', 'mileage'):
+        fig = plt.figure(figsize=(10, 6))
+        sns.histplot(data[column])
+        figures.append(_png(fig))
+    return figures
+
+
+PAGES = {'delay': ('delay_df.csv', delay_page), 'pricing': ('pricing_df.csv', pricing_page)}
+
+
+def first_render(page, bucket):
+    file_path, render = PAGES[page]
+    storage_client()
+    data = pd.read_csv(io.StringIO(read_file(bucket, file_path)))
+    return render(data)
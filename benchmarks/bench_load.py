@@ -0,0 +1,71 @@
+"""Compare the CSV-over-string load path with the Parquet path.
+
+Each variant runs in its own subprocess so peak RSS is measured in isolation.
+
+    python benchmarks/bench_load.py delay_df.csv --columns checkin_type state delays_checkout_min_cleaned
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_csv(path, columns):
+    import pandas as pd
+    with open(path, 'rb') as f:
+        content = f.read().decode('utf-8')  # same as blob.download_as_string().decode('utf-8')
+    return pd.read_csv(io.StringIO(content))
+
+
+def load_parquet(path, columns):
+    from analytics.ingest import read_columns
+    return read_columns(path, columns)
+
+
+LOADERS = {'csv': load_csv, 'parquet': load_parquet}
+
+
+def run_variant(variant, path, columns):
+    start = time.perf_counter()
+    data = LOADERS[variant](path, columns)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kilobytes on Linux
+    return {'variant': variant, 'rows': len(data), 'columns': data.shape[1],
+            'seconds': round(elapsed, 4), 'peak_rss_mb': round(peak_kb / 1024, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv_path')
+    parser.add_argument('--columns', nargs='*', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--variant', choices=LOADERS, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.path, args.columns)))
+        return
+
+    from analytics.ingest import convert_csv
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_path = convert_csv(args.csv_path, os.path.join(tmp, 'data.parquet'))
+        paths = {'csv': args.csv_path, 'parquet': parquet_path}
+        for variant, path in paths.items():
+            for _ in range(args.repeat):
+                command = [sys.executable, os.path.abspath(__file__), args.csv_path,
+                           '--variant', variant, '--path', path]
+                if args.columns:
+                    command += ['--columns'] + args.columns
+                print(subprocess.run(command, check=True, capture_output=True, text=True).stdout.strip())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Time to first render of both pages in a fresh server process.
+
+Each variant runs in its own subprocess, from the interpreter start until the
+payloads of every figure of the page are ready, on synthetic datasets served
+by a LocalBucket :
+
+- baseline : the previous pages (see baseline_pages.py), every plotting and
+  storage library imported up front, a storage client built per request, the
+  CSV decoded from a string, threshold loops and seaborn figures.
+- lazy : imports deferred until a section needs them, empty caches.
+- warm : lazy, after `python -m analytics.warmup` filled the caches.
+
+    python benchmarks/bench_startup.py --scale 1 --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+START = time.perf_counter()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+BASELINE_IMPORTS = ['streamlit', 'pandas', 'numpy', 'plotly.express', 'plotly.graph_objects', 'matplotlib.pyplot',
+                 'seaborn', 'google.oauth2.service_account', 'google.cloud.storage']
+VARIANTS = ('baseline', 'lazy', 'warm')
+
+
+def first_render(variant, page, bucket_root):
+    import importlib
+    from analytics.storage import LocalBucket
+    if variant == 'baseline':
+        for module in BASELINE_IMPORTS:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+        from baseline_pages import first_render as baseline_render
+        payloads = baseline_render(page, LocalBucket(bucket_root))
+        return {'variant': variant, 'page': page, 'figures': len(payloads),
+                'seconds': round(time.perf_counter() - START, 3), 'modules': len(sys.modules)}
+
+    # the page scripts import streamlit in every variant
+    try:
+        importlib.import_module('streamlit')
+    except ImportError:
+        pass
+    from analytics.cache import cached_figure, cached_metrics, load_page
+    from analytics.figures import page_figures
+
+    data, version = load_page(LocalBucket(bucket_root), page)
+    metrics = cached_metrics(page, version, data)
+    payloads = [cached_figure((name, version) + params, build)
+                for name, (params, build) in page_figures(page, metrics).items()]
+    return {'variant': variant, 'page': page, 'figures': len(payloads),
+            'seconds': round(time.perf_counter() - START, 3), 'modules': len(sys.modules)}
+
+
+def run(variant, page, bucket_root, cache_dir):
+    env = dict(os.environ, GETAROUND_CACHE_DIR=cache_dir, MPLBACKEND='Agg')
+    command = [sys.executable, os.path.abspath(__file__), '--variant', variant, '--page', page,
+               '--bucket', bucket_root]
+    output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument('--page', help=argparse.SUPPRESS)
+    parser.add_argument('--bucket', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        print(json.dumps(first_render(args.variant, args.page, args.bucket)))
+        return
+
+    from analytics.incremental import init_dataset
+    from analytics.schema import apply_schema
+    from synthetic import make_datasets
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bucket_root = os.path.join(tmp, 'bucket')
+        os.makedirs(bucket_root)
+        rentals, cars = make_datasets(args.scale)
+        apply_schema(rentals).to_parquet(os.path.join(tmp, 'delay_df.parquet'), index=False)
+        init_dataset(os.path.join(tmp, 'delay_df.parquet'), os.path.join(bucket_root, 'delay_df'))
+        apply_schema(cars).to_parquet(os.path.join(bucket_root, 'pricing_df.parquet'), index=False)
+        # the CSV exports read by the baseline
+        rentals.to_csv(os.path.join(bucket_root, 'delay_df.csv'), index=False)
+        cars.to_csv(os.path.join(bucket_root, 'pricing_df.csv'), index=False)
+
+        warm_cache = os.path.join(tmp, 'warm_cache')
+        env = dict(os.environ, GETAROUND_CACHE_DIR=warm_cache, MPLBACKEND='Agg')
+        subprocess.run([sys.executable, '-m', 'analytics.warmup', '--local', bucket_root],
+                       check=True, capture_output=True, cwd=ROOT, env=env)
+
+        for page in ('delay', 'pricing'):
+            for variant in VARIANTS:
+                for i in range(args.repeat):
+                    # cold variants start from an empty cache, the local dataset copy included
+                    cache_dir = warm_cache if variant == 'warm' else os.path.join(tmp, f'{variant}_{page}_{i}')
+                    print(json.dumps(run(variant, page, bucket_root, cache_dir)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Memory of each page's dataset with read_csv defaults and with the declared schema.
+
+Reports the bytes per column, and the peak memory traced while computing the
+page aggregates from both frames.
+
+    python benchmarks/memory_report.py --scale 10
+    python benchmarks/memory_report.py --delay delay_df.csv --pricing pricing_df.csv
+"""
+import argparse
+import io
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from analytics.aggregates import delay_metrics, pricing_metrics
+from analytics.schema import apply_schema, memory_report
+from synthetic import make_datasets
+
+
+def traced_peak(function, data):
+    tracemalloc.start()
+    function(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def report_page(page, data, metrics_function):
+    report = memory_report(data)
+    before, after = report.loc['total', 'bytes'], report.loc['total', 'compact_bytes']
+    print(f"\n{page} : {len(data)} rows, {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB ({after / before:.0%})")
+    print(report.to_string())
+    print(f"aggregates peak : {traced_peak(metrics_function, data) / 2**20:.1f} MB -> "
+          f"{traced_peak(metrics_function, apply_schema(data)) / 2**20:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--delay', help='delay_df.csv, synthetic data by default')
+    parser.add_argument('--pricing', help='pricing_df.csv, synthetic data by default')
+    args = parser.parse_args(argv)
+
+    delay, pricing = make_datasets(args.scale)
+    # round trip through CSV so the frames have the read_csv default dtypes the pages used to get
+    delay = pd.read_csv(args.delay or io.StringIO(delay.to_csv(index=False)))
+    pricing = pd.read_csv(args.pricing or io.StringIO(pricing.to_csv(index=False)))
+    report_page('Delay', delay, delay_metrics)
+    report_page('Pricing', pricing, pricing_metrics)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Time each stage of both pages on synthetic datasets at several scales.
+
+Every stage runs twice, once timed and once traced with tracemalloc for its
+peak allocated memory. Memory held by Arrow buffers is not traced, so the max
+RSS of each scale is recorded as well. Results are written as JSON to compare
+runs over time.
+
+    python benchmarks/run.py --scales 1 10 100 --output bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+
+from analytics import figures
+from analytics.aggregates import delay_metrics, pricing_metrics
+from analytics.incremental import derive_columns
+from analytics.ingest import convert_csv, read_columns
+from analytics.report import BUSINESS_THRESHOLDS, MEDIAN_RENTAL, PENALTY, USER_THRESHOLDS
+from analytics.revenue import revenue_above, risk_over_revenue_above
+from analytics.thresholds import impact_curves
+from synthetic import make_cars, make_rentals
+
+
+def measure(results, stage, function, *args):
+    # timed and traced in two separate calls, tracemalloc slows down allocation heavy code
+    start = time.perf_counter()
+    value = function(*args)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results[stage] = {'seconds': round(seconds, 5), 'peak_mb': round(peak / 2**20, 2)}
+    return value
+
+
+def threshold_sweeps(metrics):
+    minute_rate = MEDIAN_RENTAL / 1440
+    return (impact_curves(metrics['impact_index'], USER_THRESHOLDS),
+            revenue_above(metrics['delay_index'], np.arange(0, 60*24), minute_rate),
+            risk_over_revenue_above(metrics['delay_index'], BUSINESS_THRESHOLDS, MEDIAN_RENTAL, minute_rate, PENALTY))
+
+
+def render_figures(page_figures):
+    # same figures as the pages, see analytics.figures.delay_page_figures and pricing_page_figures
+    payloads = [figures.render_payload(build())[1] for _, build in page_figures.values()]
+    return sum(len(payload) for payload in payloads)
+
+
+def bench_delay(scale, tmp):
+    results = {}
+    raw = make_rentals(scale)
+    csv_path = os.path.join(tmp, 'delay_df.csv')
+    derive_columns(raw).to_csv(csv_path, index=False)
+    parquet_path = convert_csv(csv_path, os.path.join(tmp, 'delay_df.parquet'))
+
+    measure(results, 'parse_csv', pd.read_csv, csv_path)
+    data = measure(results, 'load_parquet', read_columns, parquet_path)
+    measure(results, 'derived_columns', derive_columns, raw)
+    metrics = measure(results, 'aggregates', delay_metrics, data)
+    measure(results, 'threshold_sweeps', threshold_sweeps, metrics)
+    measure(results, 'figures', render_figures, figures.delay_page_figures(metrics))
+    return {'rows': len(data), 'stages': results}
+
+
+def bench_pricing(scale, tmp):
+    results = {}
+    csv_path = os.path.join(tmp, 'pricing_df.csv')
+    make_cars(scale).to_csv(csv_path, index=False)
+    parquet_path = convert_csv(csv_path, os.path.join(tmp, 'pricing_df.parquet'))
+
+    measure(results, 'parse_csv', pd.read_csv, csv_path)
+    data = measure(results, 'load_parquet', read_columns, parquet_path)
+    metrics = measure(results, 'aggregates', pricing_metrics, data)
+    measure(results, 'correlation', lambda: data.corr(numeric_only=True))
+    measure(results, 'figures', render_figures, figures.pricing_page_figures(metrics))
+    return {'rows': len(data), 'stages': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    runs = []
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            run = {'scale': scale, 'delay': bench_delay(scale, tmp), 'pricing': bench_pricing(scale, tmp)}
+        run['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        runs.append(run)
+        for page in ('delay', 'pricing'):
+            stages = ', '.join(f"{stage} {values['seconds']:.3f}s" for stage, values in run[page]['stages'].items())
+            print(f"x{scale:g} {page} ({run[page]['rows']} rows): {stages}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                   'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'runs': runs}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
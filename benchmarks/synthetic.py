@@ -0,0 +1,70 @@
+"""Synthetic datasets with the schema of `delay_df.csv` and `pricing_df.csv`.
+
+Sizes are given as a multiple of the original exports (21 310 rentals and
+4 843 cars), distributions roughly follow the real data.
+"""
+import numpy as np
+import pandas as pd
+
+from analytics.incremental import derive_columns
+
+BASE_RENTALS = 21310
+BASE_CARS = 4843
+
+BRANDS = ['Citroën', 'Renault', 'BMW', 'Peugeot', 'Audi', 'Nissan', 'Mitsubishi', 'Mercedes', 'Volkswagen', 'Toyota',
+          'SEAT', 'Subaru', 'PGO', 'Opel', 'Ferrari', 'Maserati', 'Suzuki', 'Porsche', 'Alfa Romeo', 'Kia Motors',
+          'Fiat', 'Lexus', 'Lamborghini', 'Mini', 'Honda', 'Yamaha', 'Ford', 'KIA']
+CAR_TYPES = ['estate', 'sedan', 'suv', 'hatchback', 'subcompact', 'coupe', 'convertible', 'van']
+FUELS = ['diesel', 'petrol', 'hybrid_petrol', 'electro']
+COLORS = ['black', 'grey', 'white', 'red', 'silver', 'blue', 'orange', 'beige', 'brown', 'green']
+OPTIONS = ['private_parking_available', 'has_gps', 'has_air_conditioning', 'automatic_car',
+           'has_getaround_connect', 'has_speed_regulator', 'winter_tires']
+
+
+def make_rentals(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(BASE_RENTALS * scale)
+    rental_id = np.arange(500000, 500000 + n)
+    state = np.where(rng.random(n) < 0.153, 'canceled', 'ended')
+    delay = np.round(rng.laplace(5, 60, n) + np.where(rng.random(n) < 0.02, rng.exponential(3000, n), 0))
+    delay = np.where((state == 'canceled') | (rng.random(n) < 0.01), np.nan, delay)
+    # about 9% of the rentals follow a previous rental of the same car within 12 hours
+    follows = rng.random(n) < 0.09
+    follows[0] = False
+    previous = np.where(follows, rental_id[(rng.random(n) * np.arange(n)).astype(int)], np.nan)
+    time_delta = np.where(follows, rng.integers(0, 25, n) * 30, np.nan).astype(float)
+    rentals = pd.DataFrame({
+        'rental_id': rental_id,
+        'car_id': rng.integers(0, max(1, int(BASE_CARS * scale)), n),
+        'checkin_type': np.where(rng.random(n) < 0.8, 'mobile', 'connect'),
+        'state': state,
+        'delay_at_checkout_in_minutes': delay,
+        'previous_ended_rental_id': previous,
+        'time_delta_with_previous_rental_in_minutes': time_delta,
+    })
+    return rentals
+
+
+def make_cars(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(BASE_CARS * scale)
+    weights = 1 / np.arange(1, len(BRANDS) + 1) ** 1.2
+    cars = pd.DataFrame({
+        'model_key': rng.choice(BRANDS, n, p=weights / weights.sum()),
+        'mileage': np.abs(rng.normal(140000, 60000, n)).astype(int),
+        'engine_power': rng.choice([90, 100, 110, 120, 135, 140, 150, 190, 230], n),
+        'fuel': rng.choice(FUELS, n, p=[0.95, 0.04, 0.005, 0.005]),
+        'paint_color': rng.choice(COLORS, n),
+        'car_type': rng.choice(CAR_TYPES, n),
+    })
+    for option in OPTIONS:
+        cars[option] = rng.random(n) < rng.uniform(0.1, 0.8)
+    price = (60 + cars['engine_power'] * 0.45 - cars['mileage'] / 10000
+             + cars[OPTIONS].sum(axis=1) * 4 + rng.normal(0, 15, n))
+    cars['rental_price_per_day'] = price.clip(10, 400).round().astype(int)
+    return cars
+
+
+def make_datasets(scale=1, seed=0):
+    # delay dataset with its derived columns, and pricing dataset
+    return derive_columns(make_rentals(scale, seed)), make_cars(scale, seed)
@@ -0,0 +1,101 @@
+"""Streamlit helpers shared by the dashboard pages."""
+import pandas as pd
+import streamlit as st
+
+from analytics.figures import render_payload
+from analytics.pagination import filter_mask, page_count, page_slice
+from analytics.profiling import Profiler
+from analytics.cache import cached_figure, cached_metrics, read_dataset as read_bucket_dataset
+
+
+# One storage client per server process, shared by every page and session.
+@st.experimental_singleton
+def storage_client():
+    from google.oauth2 import service_account
+    from google.cloud import storage
+    credentials = service_account.Credentials.from_service_account_info(st.secrets["gcp_service_account"])
+    return storage.Client(credentials=credentials)
+
+
+# Uses st.experimental_memo to only rerun when the query changes or after 10 min.
+# Datasets are stored as typed Parquet (see analytics/ingest.py), only the requested columns are parsed.
+# Each file is kept in a local cache and only downloaded again when its generation changes.
+@st.experimental_memo(ttl=600)
+def read_dataset(bucket_name, file_path, columns=None):
+    return read_bucket_dataset(storage_client().bucket(bucket_name), file_path, columns)
+
+
+# Aggregates are computed once per dataset version and kept on disk (see analytics/cache.py),
+# reruns only render them.
+@st.experimental_memo(max_entries=4)
+def page_metrics(page, version, _data):
+    return cached_metrics(page, version, _data)
+
+
+# Rendered figures are cached in memory on their key (figure name, dataset version and plot parameters),
+# `_build` is only called on a cache miss.
+@st.experimental_memo(max_entries=128)
+def _render(key, _build):
+    return render_payload(_build())
+
+
+# Page figures are also kept on disk, shared with the other server processes and the warm-up.
+@st.experimental_memo(max_entries=32)
+def _render_page_figure(key, _build):
+    return cached_figure(key, _build)
+
+
+def _show(kind, payload):
+    if kind == 'plotly':
+        import plotly.io as pio
+        st.plotly_chart(pio.from_json(payload), use_container_width=True)
+    else:
+        st.image(payload, use_column_width=True)
+
+
+def show_figure(build, *key):
+    # ad hoc figures, such as drill-down selections, are only cached in memory
+    _show(*_render(key, build))
+
+
+def show_page_figure(page_figures, name, version):
+    # page_figures : specs of analytics.figures.delay_page_figures or pricing_page_figures
+    params, build = page_figures[name]
+    _show(*_render_page_figure((name, version) + params, build))
+
+
+def raw_data_explorer(data, filter_columns=()):
+    # Only the requested page of the filtered, sorted rows is sent to the browser.
+    columns = st.multiselect('Columns', list(data.columns), default=list(data.columns))
+    filters = {}
+    filter_cols = st.columns(len(filter_columns)) if filter_columns else []
+    for col, column in zip(filter_cols, filter_columns):
+        with col:
+            filters[column] = st.multiselect(column, sorted(data[column].dropna().unique()))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_by = st.selectbox('Sort by', [None] + list(data.columns))
+    with col2:
+        ascending = st.checkbox('Ascending', value=True)
+    with col3:
+        page_size = st.selectbox('Rows per page', [25, 50, 100, 500], index=1)
+
+    total_rows = int(filter_mask(data, filters).sum())
+    page = st.number_input('Page', min_value=1, max_value=page_count(total_rows, page_size), value=1)
+    rows, total_rows = page_slice(data, page, page_size, filters, columns or None, sort_by, ascending)
+    st.dataframe(rows)
+    start = (page - 1) * page_size
+    st.caption(f"Rows {min(start + 1, total_rows)} to {start + len(rows)} of {total_rows}")
+
+
+def start_profiling(page):
+    # memory tracing is opt-in from the sidebar, times are always recorded
+    return Profiler(page, trace_memory=st.sidebar.checkbox('Show profiling'))
+
+
+def show_profiling(profiler):
+    sections = profiler.finish()
+    profiler.write()
+    if profiler.trace_memory:
+        st.sidebar.subheader('Profiling')
+        st.sidebar.dataframe(pd.DataFrame(sections).set_index('section').round(3))
@@ -1,14 +1,10 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import io
-from google.oauth2 import service_account
-from google.cloud import storage
+
+from analytics import figures
+from analytics.cache import BUCKET_NAME, DATASETS
+from analytics.cube import OPTIONS, group_stats, slice_stats
+from components import (page_metrics, raw_data_explorer, read_dataset, show_figure, show_page_figure,
+                        show_profiling, start_profiling)
 
 # Page config, titles & introduction
 st.set_page_config(page_title="getaround dashboard", page_icon=":red_car:", layout="wide")
@@ -17,94 +13,130 @@ st.set_page_config(page_title="getaround dashboard", page_icon=":red_car:", layo
 st.sidebar.write("Dashboard made by [@Ukratic](https://github.com/Ukratic)")
 st.sidebar.success("Navigate to a page above")
 
+profiler = start_profiling('pricing')
+
 st.header("Getaround data : Pricing")
 st.markdown("""Egregious outliers have been removed but otherwise the data is unchanged.
 """)
 
-# Google storage credentials
-credentials = service_account.Credentials.from_service_account_info(
-    st.secrets["gcp_service_account"]
-)
-client = storage.Client(credentials=credentials)
-
-# Uses st.experimental_memo to only rerun when the query changes or after 10 min.
-@st.experimental_memo(ttl=600)
-def read_file(bucket_name, file_path):
-    bucket = client.bucket(bucket_name)
-    content = bucket.blob(file_path).download_as_string().decode('utf-8')
-    return content
+profiler.mark('data load')
+# Predictions for the whole fleet, only cars missing from the local cache are sent to the API.
+@st.experimental_memo(max_entries=4)
+def predicted_prices(version, _data):
+    from analytics.predictions import predict_prices
+    return predict_prices(_data)
 
-bucket_name = "get_around_data"
-file_path = "pricing_df.csv"
+# The storage client, dataset and aggregates are shared with the other page and the boot-time warm-up
+# (see analytics/cache.py), so a warmed up server only loads them from disk.
+bucket_name = BUCKET_NAME
+file_path, columns = DATASETS['pricing']
 
 data_load_state = st.text('Loading data, please wait...')
-content = read_file(bucket_name, file_path)
-
-data = pd.read_csv(io.StringIO(content))
+data, version = read_dataset(bucket_name, file_path, columns)
+metrics = page_metrics('pricing', version, data)
+page_figures = figures.pricing_page_figures(metrics)
 data_load_state.text("")
 
+profiler.mark('raw data')
 # Show raw data
 if st.checkbox('Show raw data'):
     st.subheader('Raw data')
-    st.write(data)
+    raw_data_explorer(data, ('model_key', 'car_type', 'fuel'))
 
+profiler.mark('exploration')
 # Data exploration
 st.subheader("Data exploration")
 
 st.markdown("""A quick overview of the data""")
 
-fig = px.sunburst(data, path=['model_key', 'car_type'], values='rental_price_per_day',width=1000,height=800, 
-labels={'rental_price_per_day':'Rental revenue per day'})
-fig.update_layout(title='Rental revenue per day per brand and car type')
-st.plotly_chart(fig,use_container_width=True)
+show_page_figure(page_figures, 'revenue_sunburst', version)
 
 
+profiler.mark('brands')
 st.markdown("""Data on car brands and models""")
 col1, col2= st.columns(2)
 
 with col1 :
 #plot 1    
-    models_df = data.groupby('model_key').mean().sort_values(by='rental_price_per_day',ascending=False)
-
-    fig = plt.figure(figsize=(10,6))
-    sns.barplot(x=models_df.index,y=models_df['rental_price_per_day'],palette='Set2')
-    plt.xticks(rotation=60)
-    plt.title('Average rental price per day per brand')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'models_mean', version)
 
 with col2 : 
-    models2_df = data.groupby('model_key').sum().sort_values('rental_price_per_day',ascending=False)
-
-    fig = plt.figure(figsize=(10,6))
-    sns.barplot(x=models2_df.index,y=models2_df['rental_price_per_day'],palette='husl')
-    plt.xticks(rotation=60)
-    plt.title('Total rental revenue per day per brand')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'models_sum', version)
 
 st.markdown("The 5 top brands (Renault, Citroën, BMW, Audi and Peugeot) are on the cheaper side but much more important to the business, with more than 75% of income from rentals.")
 
 
-fig = plt.figure(figsize=(12,7))
-corr_mx = data.corr()
-matrix = np.triu(corr_mx) # take upper correlation matrix
-
-sns.heatmap(corr_mx, mask=matrix,annot=True, cmap = 'YlGnBu', linewidths=0.1, square=True)
-st.pyplot(fig)
+profiler.mark('correlation')
+show_page_figure(page_figures, 'correlation_heatmap', version)
 
+profiler.mark('distributions')
 st.markdown("Bigger engine power, comfort options and less mileage contribute to a higher rental price per day. This makes sense !")
 
 col1, col2= st.columns(2)
 with col1 :
 #plot 1    
-    fig = plt.figure(figsize=(10,6))
-    sns.histplot(data['rental_price_per_day'])
-    plt.title('Distribution of rental price per day')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'price_histogram', version)
 
 with col2 : 
-    fig = plt.figure(figsize=(10,6))
-    sns.histplot(data['mileage'])
-    plt.title('Distribution of mileage')
-    st.pyplot(fig)
+    show_page_figure(page_figures, 'mileage_histogram', version)
+
+st.markdown("Most rentals cost between 100 and 150 per day.")
 
-st.markdown("Most rentals cost between 100 and 150 per day.")
\ No newline at end of file
+profiler.mark('drill down')
+# Drill down, answered from the pricing cube without going back to the rows
+st.subheader("Drill down")
+
+cube = metrics['cube']
+dimensions = cube['dimensions']
+col1, col2, col3, col4 = st.columns(4)
+with col1 :
+    brands = st.multiselect('Brand', sorted(dimensions['model_key'].dropna().unique()))
+with col2 :
+    car_types = st.multiselect('Car type', sorted(dimensions['car_type'].dropna().unique()))
+with col3 :
+    fuels = st.multiselect('Fuel', sorted(dimensions['fuel'].dropna().unique()))
+with col4 :
+    options = st.multiselect('Options', [option for option in OPTIONS if option in dimensions.columns])
+
+filters = {'model_key': brands, 'car_type': car_types, 'fuel': fuels}
+filters.update({option: [True] for option in options})
+selection = slice_stats(cube, filters)
+
+if selection['count'] == 0:
+    st.markdown("No car matches this selection.")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric('Cars', selection['count'])
+    col2.metric('Average price per day', round(selection['mean']['rental_price_per_day'],2))
+    col3.metric('Total revenue per day', round(selection['sum']['rental_price_per_day'],2))
+    col4.metric('Price standard deviation', round(selection['var']['rental_price_per_day']**0.5,2))
+
+    _, selection_mean, _ = group_stats(cube, 'model_key', filters)
+    selection_key = tuple((column, tuple(values)) for column, values in filters.items())
+    col1, col2= st.columns(2)
+    with col1 :
+        show_figure(lambda: figures.brand_barplot(selection_mean.sort_values(by='rental_price_per_day',ascending=False),
+                                                  'Set2', 'Average rental price per day per brand (selection)'),
+                    'selection_models_mean', version, selection_key)
+    with col2 :
+        show_figure(lambda: figures.correlation_heatmap(selection['corr']), 'selection_correlation_heatmap', version, selection_key)
+
+profiler.mark('predictions')
+st.subheader("Predicted vs actual price")
+
+if st.checkbox('Compare with the pricing API predictions'):
+    import httpx  # only loaded when the section is opened
+    try:
+        predicted = predicted_prices(version, data)
+    except (httpx.HTTPError, KeyError, ValueError) as exc:
+        st.warning(f"No predictions from the pricing API : {exc}")
+    else:
+        actual = data['rental_price_per_day']
+        error = predicted - actual
+        col1, col2, col3 = st.columns(3)
+        col1.metric('Mean absolute error', round(error.abs().mean(),2))
+        col2.metric('Mean error', round(error.mean(),2))
+        col3.metric('Cars within 10%', f"{round((error.abs() <= actual*0.1).mean()*100,2)}%")
+        show_figure(lambda: figures.prediction_scatter(actual, predicted), 'prediction_scatter', version)
+
+show_profiling(profiler)
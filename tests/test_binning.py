@@ -0,0 +1,37 @@
+"""Incremental histogram updates of analytics.binning."""
+import numpy as np
+
+from analytics.binning import bin_counts, update_bin_counts
+
+
+def test_update_inside_edges():
+    rng = np.random.default_rng(0)
+    history, batch = rng.normal(0, 10, 5000), rng.normal(0, 5, 500)
+    counts, edges = update_bin_counts(*bin_counts(history), batch)
+    assert np.array_equal(edges, bin_counts(history)[1])
+    assert np.array_equal(counts, np.histogram(np.concatenate([history, batch]), bins=edges)[0])
+
+
+def test_edges_extended_by_whole_bins():
+    history = np.arange(0, 600, 30, dtype=float)
+    counts, edges = bin_counts(history)
+    width = edges[1] - edges[0]
+    batch = np.array([-45., 700., 720.])
+    new_counts, new_edges = update_bin_counts(counts, edges, batch)
+
+    assert new_edges[0] <= -45 and new_edges[-1] >= 720
+    assert np.allclose(np.diff(new_edges), width)
+    assert new_counts.sum() == len(history) + len(batch)
+    # the previous bins keep their counts, the batch is counted on the new edges
+    below = int(round((edges[0] - new_edges[0]) / width))
+    previous = np.zeros_like(new_counts)
+    previous[below:below + len(counts)] = counts
+    assert np.array_equal(new_counts - previous, np.histogram(batch, bins=new_edges)[0])
+
+
+def test_bins_merged_past_max_bins():
+    counts, edges = bin_counts(np.arange(100, dtype=float), bins=50)
+    new_counts, new_edges = update_bin_counts(counts, edges, np.array([1000.]), max_bins=60)
+    assert len(new_counts) <= 60
+    assert len(new_edges) == len(new_counts) + 1
+    assert new_counts.sum() == 101
@@ -0,0 +1,61 @@
+"""Slices of the pricing cube against the same statistics computed by pandas on the rows."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.cube import MEASURES, OPTIONS, build_pricing_cube, group_stats, slice_stats
+
+FILTERS = {
+    'all': {},
+    'filtered': {'car_type': ['sedan', 'suv'], 'fuel': ['diesel']},
+    'constant option': {'has_gps': [True]},
+    'one row': {'model_key': ['Lancia']},
+    'empty': {'model_key': ['Tesla']},
+}
+
+
+@pytest.fixture
+def cars():
+    rng = np.random.default_rng(0)
+    n = 2000
+    cars = pd.DataFrame({
+        'model_key': rng.choice(['Renault', 'Citroën', 'BMW', 'Audi', 'Peugeot'], n),
+        'mileage': rng.integers(1000, 300000, n),
+        'engine_power': rng.integers(70, 250, n),
+        'fuel': rng.choice(['diesel', 'petrol', 'hybrid_petrol'], n),
+        'paint_color': rng.choice(['black', 'grey', 'white'], n),
+        'car_type': rng.choice(['sedan', 'suv', 'estate', 'convertible'], n),
+    })
+    for option in OPTIONS:
+        cars[option] = rng.random(n) < 0.5
+    cars['rental_price_per_day'] = (60 + cars['engine_power'] * 0.45 + rng.normal(0, 15, n)).round().astype(int)
+    cars.loc[0, 'model_key'] = 'Lancia'
+    return cars
+
+
+def _rows(cars, filters):
+    mask = np.ones(len(cars), dtype=bool)
+    for column, values in filters.items():
+        mask &= cars[column].isin(values)
+    return cars.loc[mask, MEASURES].astype(float), cars.loc[mask, 'model_key']
+
+
+@pytest.mark.parametrize('name', FILTERS)
+def test_slice_stats_match_pandas(cars, name):
+    rows, _ = _rows(cars, FILTERS[name])
+    stats = slice_stats(build_pricing_cube(cars), FILTERS[name])
+    assert stats['count'] == len(rows)
+    assert np.allclose(stats['sum'], rows.sum())
+    assert np.allclose(stats['mean'], rows.mean(), equal_nan=True)
+    assert np.allclose(stats['var'], rows.var(), equal_nan=True)
+    assert np.allclose(stats['corr'], rows.corr(), equal_nan=True)
+
+
+@pytest.mark.parametrize('name', FILTERS)
+def test_group_stats_match_groupby(cars, name):
+    rows, keys = _rows(cars, FILTERS[name])
+    count, mean, total = group_stats(build_pricing_cube(cars), 'model_key', FILTERS[name])
+    grouped = rows.groupby(keys.to_numpy(), observed=True)
+    assert count.to_dict() == grouped.size().to_dict()
+    assert np.allclose(mean.sort_index(), grouped.mean().sort_index())
+    assert np.allclose(total.sort_index(), grouped.sum().sort_index())
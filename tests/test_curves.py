@@ -0,0 +1,60 @@
+"""Threshold curves of the Delay page against the loops they replaced."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.aggregates import impacted_rentals
+from analytics.revenue import build_delay_index, revenue_above, risk_over_revenue_above
+from analytics.thresholds import build_impact_index, impact_curves
+
+MEDIAN_RENTAL = 119
+MINUTE_RATE = MEDIAN_RENTAL / 1440
+
+
+@pytest.fixture
+def rentals():
+    rng = np.random.default_rng(0)
+    n = 3000
+    delay = np.round(rng.laplace(5, 60, n))
+    delay[rng.random(n) < 0.1] = np.nan
+    time_delta = np.where(rng.random(n) < 0.3, rng.integers(0, 25, n) * 30, np.nan)
+    return pd.DataFrame({
+        'checkin_type': np.where(rng.random(n) < 0.8, 'mobile', 'connect'),
+        'delay_at_checkout_in_minutes': delay,
+        'time_delta_with_previous_rental_in_minutes': time_delta,
+        'delays_checkout_min_cleaned': np.where(np.abs(delay) <= 1440, delay, np.nan),
+    })
+
+
+def test_impact_curves_match_loop(rentals):
+    threshold_range = np.arange(0, 60*12, step=15)
+    impacted_df = impacted_rentals(rentals)
+    curves = impact_curves(build_impact_index(impacted_df), threshold_range)
+
+    for t_index, t in enumerate(threshold_range):
+        impacted = impacted_df[impacted_df['time_delta_with_previous_rental_in_minutes'] < t]
+        solved = impacted_df[impacted_df['difference'] < 0]
+        solved = solved[solved['delay_at_checkout_in_minutes'] < t]
+        assert curves['impacted_total'][t_index] == len(impacted)
+        assert curves['solved_total'][t_index] == len(solved)
+        for checkin_type in ('connect', 'mobile'):
+            assert curves[f'impacted_{checkin_type}'][t_index] == (impacted['checkin_type'] == checkin_type).sum()
+            assert curves[f'solved_{checkin_type}'][t_index] == (solved['checkin_type'] == checkin_type).sum()
+
+
+def test_revenue_curves_match_loop(rentals):
+    threshold_range = np.arange(0, 60*24, step=15)
+    index = build_delay_index(rentals['delays_checkout_min_cleaned'])
+    revenue = revenue_above(index, threshold_range, MINUTE_RATE)
+    risk_over_revenue = risk_over_revenue_above(index, threshold_range, MEDIAN_RENTAL, MINUTE_RATE, 3)
+
+    delays = rentals['delays_checkout_min_cleaned']
+    for t_index, t in enumerate(threshold_range):
+        late = delays[delays > t]
+        assert revenue[t_index] == pytest.approx(late.sum() * MINUTE_RATE)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = len(late) * MEDIAN_RENTAL / (late.sum() * MINUTE_RATE * 3)
+        if np.isfinite(expected):
+            assert risk_over_revenue[t_index] == pytest.approx(expected)
+        else:
+            assert not np.isfinite(risk_over_revenue[t_index])
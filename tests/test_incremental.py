@@ -0,0 +1,86 @@
+"""Appending rentals with analytics.incremental against a full recompute."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.aggregates import delay_metrics
+from analytics.incremental import append_rentals, derive_columns, init_dataset
+from analytics.ingest import load_manifest, read_parts
+from analytics.schema import apply_schema
+
+COUNTS = ['checkout_counts', 'next_rental_counts', 'checkin_counts', 'canceled_checkin_counts', 'state_counts']
+
+
+@pytest.fixture
+def rentals():
+    rng = np.random.default_rng(0)
+    n = 4000
+    rental_id = np.arange(500000, 500000 + n)
+    state = np.where(rng.random(n) < 0.15, 'canceled', 'ended')
+    delay = np.round(rng.laplace(5, 60, n) + np.where(rng.random(n) < 0.02, rng.exponential(3000, n), 0))
+    delay = np.where(state == 'canceled', np.nan, delay)
+    # a tenth of the rentals follow an earlier rental, of the history or of the same batch
+    follows = rng.random(n) < 0.1
+    follows[0] = False
+    previous = np.where(follows, rental_id[(rng.random(n) * np.arange(n)).astype(int)], np.nan)
+    return pd.DataFrame({
+        'rental_id': rental_id,
+        'car_id': rng.integers(0, 500, n),
+        'checkin_type': np.where(rng.random(n) < 0.8, 'mobile', 'connect'),
+        'state': state,
+        'delay_at_checkout_in_minutes': delay,
+        'previous_ended_rental_id': previous,
+        'time_delta_with_previous_rental_in_minutes': np.where(follows, rng.integers(0, 25, n) * 30, np.nan),
+    })
+
+
+def _counts(series):
+    return {key: int(count) for key, count in series.items() if count}
+
+
+def test_append_matches_full_recompute(rentals, tmp_path):
+    history = apply_schema(derive_columns(rentals.iloc[:2500]))
+    history.to_parquet(tmp_path / 'delay_df.parquet', index=False)
+    directory = str(tmp_path / 'delay_df')
+    init_dataset(str(tmp_path / 'delay_df.parquet'), directory)
+    metrics = delay_metrics(read_parts(directory))
+
+    # the second batch repeats rentals of the first one, which are skipped
+    append_rentals(directory, metrics, rentals.iloc[2500:3300])
+    manifest = append_rentals(directory, metrics, rentals.iloc[3000:])
+    assert len(manifest['parts']) == 3
+    assert manifest['derived_columns_checked']
+
+    data = read_parts(directory, manifest=load_manifest(directory))
+    assert len(data) == len(rentals)
+    expected = delay_metrics(data)
+    assert metrics['rentals'] == expected['rentals']
+    for name in COUNTS:
+        assert _counts(metrics[name]) == _counts(expected[name]), name
+    assert metrics['late_count'] == expected['late_count']
+    assert metrics['late_minutes'] == pytest.approx(expected['late_minutes'])
+    assert metrics['issues'] == expected['issues']
+    assert metrics['issues_over_30'] == expected['issues_over_30']
+    for name, arrays in expected['impact_index'].items():
+        for key, values in arrays.items():
+            assert np.array_equal(metrics['impact_index'][name][key], values), (name, key)
+    for key, values in expected['delay_index'].items():
+        assert np.allclose(metrics['delay_index'][key], values), key
+
+
+def test_append_checks_derived_columns(rentals, tmp_path):
+    history = derive_columns(rentals.iloc[:2500])
+    history['delays_checkout_min_cleaned'] = history['delay_at_checkout_in_minutes']
+    apply_schema(history).to_parquet(tmp_path / 'delay_df.parquet', index=False)
+    directory = str(tmp_path / 'delay_df')
+    init_dataset(str(tmp_path / 'delay_df.parquet'), directory)
+    with pytest.raises(ValueError, match='delays_checkout_min_cleaned'):
+        append_rentals(directory, delay_metrics(read_parts(directory)), rentals.iloc[2500:])
+
+
+def test_late_minutes_summed_in_float64(rentals):
+    # whole minutes, held exactly in float32, with a total past the 2**24 integers float32 holds
+    rentals = pd.concat([rentals] * 25, ignore_index=True)
+    rentals['delay_at_checkout_in_minutes'] = np.random.default_rng(0).integers(1, 1440, len(rentals)).astype(float)
+    data = derive_columns(rentals)
+    assert delay_metrics(apply_schema(data))['late_minutes'] == data['delays_checkout_min_cleaned'].sum()
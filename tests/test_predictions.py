@@ -0,0 +1,76 @@
+"""Batched pricing API client against the local stub of analytics.predict_stub."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.cube import OPTIONS
+from analytics.predict_stub import running_stub, stub_price
+from analytics.predictions import feature_rows, predict_prices
+from analytics.schema import PRICING_SCHEMA, apply_schema
+
+
+@pytest.fixture
+def cars():
+    rng = np.random.default_rng(0)
+    n = 120
+    cars = pd.DataFrame({
+        'model_key': rng.choice(['Renault', 'Citroën', 'BMW'], n),
+        'mileage': rng.integers(10000, 300000, n),
+        'engine_power': rng.choice([90, 120, 190], n),
+        'fuel': rng.choice(['diesel', 'petrol'], n),
+        'paint_color': rng.choice(['black', 'grey', 'white'], n),
+        'car_type': rng.choice(['estate', 'sedan', 'suv'], n),
+        'rental_price_per_day': rng.integers(50, 200, n),
+    })
+    for option in OPTIONS:
+        cars[option] = rng.random(n) < 0.5
+    return apply_schema(cars[list(PRICING_SCHEMA)])
+
+
+@pytest.fixture
+def stub():
+    with running_stub() as server:
+        yield server, f'http://127.0.0.1:{server.server_port}/predict'
+
+
+def test_predictions_are_cached(cars, stub, tmp_path):
+    server, url = stub
+    cache_path = str(tmp_path / 'predictions.json')
+    predicted = predict_prices(cars, url, cache_path, batch_size=50)
+    assert server.requests_served == 3
+    assert predicted.tolist() == [stub_price(row) for row in feature_rows(cars)]
+    assert predicted.index.equals(cars.index)
+
+    # second call answered from the cache
+    assert predict_prices(cars, url, cache_path, batch_size=50).equals(predicted)
+    assert server.requests_served == 3
+
+
+def test_only_changed_cars_are_sent(cars, stub, tmp_path):
+    server, url = stub
+    cache_path = str(tmp_path / 'predictions.json')
+    predict_prices(cars, url, cache_path, batch_size=50)
+    changed = cars.copy()
+    changed.loc[changed.index[:10], 'mileage'] += 1
+    predict_prices(changed, url, cache_path, batch_size=50)
+    assert server.requests_served == 4
+
+
+def test_cache_is_per_endpoint_and_model(cars, stub, monkeypatch, tmp_path):
+    server, url = stub
+    monkeypatch.setattr('analytics.predictions.CACHE_DIR', str(tmp_path))
+    predict_prices(cars, url)
+    with running_stub() as other:
+        predict_prices(cars, f'http://127.0.0.1:{other.server_port}/predict')
+        assert other.requests_served == 1
+    predict_prices(cars, url, model_version='2')
+    assert server.requests_served == 2
+
+
+def test_missing_features_rejected(cars, stub, tmp_path):
+    server, url = stub
+    cars['mileage'] = cars['mileage'].astype(float)
+    cars.loc[cars.index[:3], 'mileage'] = np.nan
+    with pytest.raises(ValueError, match=r'3 cars .*\(mileage\)'):
+        predict_prices(cars, url, str(tmp_path / 'predictions.json'))
+    assert server.requests_served == 0
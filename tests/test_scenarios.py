@@ -0,0 +1,50 @@
+"""What-if grid of analytics.scenarios against the Delay page formulas."""
+import numpy as np
+import pytest
+
+from analytics.revenue import build_delay_index, risk_over_revenue_above
+from analytics.scenarios import evaluate_scenarios
+
+PENALTIES = [1, 2, 3]
+RENTAL_HOURS = [6, 24]
+MEDIAN_RENTALS = [90, 119]
+THRESHOLDS = np.arange(0, 60*24, step=15)
+
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(0)
+    return build_delay_index(np.round(rng.laplace(5, 60, 5000)))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_full_day_slice_matches_risk_over_revenue(index, workers):
+    table, _ = evaluate_scenarios(index, 700, PENALTIES, RENTAL_HOURS, MEDIAN_RENTALS, THRESHOLDS, workers=workers)
+    assert len(table) == len(PENALTIES) * len(RENTAL_HOURS) * len(MEDIAN_RENTALS) * len(THRESHOLDS)
+    for penalty in PENALTIES:
+        for median_rental in MEDIAN_RENTALS:
+            rows = table[(table['penalty'] == penalty) & (table['rental_hours'] == 24)
+                         & (table['median_rental'] == median_rental)]
+            expected = risk_over_revenue_above(index, THRESHOLDS, median_rental, median_rental / 1440, penalty)
+            assert np.array_equal(rows['threshold'], THRESHOLDS)
+            assert np.allclose(rows['risk_over_revenue'], expected, equal_nan=True)
+
+
+def test_best_threshold(index):
+    _, best = evaluate_scenarios(index, 700, PENALTIES, RENTAL_HOURS, MEDIAN_RENTALS, THRESHOLDS)
+    assert len(best) == len(PENALTIES) * len(RENTAL_HOURS) * len(MEDIAN_RENTALS)
+    for row in best.itertuples():
+        ratio = risk_over_revenue_above(index, THRESHOLDS, row.median_rental, row.median_rental / 1440, row.penalty)
+        ratio = ratio * row.rental_hours / 24
+        covered = np.flatnonzero(ratio <= 1)
+        if len(covered):
+            assert row.best_threshold == THRESHOLDS[covered[0]]
+            assert row.risk_over_revenue == pytest.approx(ratio[covered[0]])
+        else:
+            assert np.isnan(row.best_threshold) and np.isnan(row.risk_over_revenue)
+    assert best['best_threshold'].notna().any() and best['best_threshold'].isna().any()
+
+
+def test_empty_axis_raises(index):
+    with pytest.raises(ValueError, match='penalty'):
+        evaluate_scenarios(index, 700, [], RENTAL_HOURS, MEDIAN_RENTALS, THRESHOLDS)
@@ -0,0 +1,19 @@
+"""Bool parsing of analytics.schema."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.schema import apply_schema
+
+
+def test_known_spellings():
+    data = apply_schema(pd.DataFrame({'next_rental': ['True', 'false', 'Yes', 'no', '1', '0'],
+                                      'has_gps': [1, 0, 1, 0, True, False]}))
+    assert data['next_rental'].tolist() == [True, False, True, False, True, False]
+    assert data['has_gps'].dtype == bool
+
+
+@pytest.mark.parametrize('values', [['No', 'maybe'], [True, np.nan], ['True', None]])
+def test_unknown_values_raise(values):
+    with pytest.raises(ValueError, match='next_rental'):
+        apply_schema(pd.DataFrame({'next_rental': values}))
@@ -0,0 +1,81 @@
+"""Local blob cache of analytics.storage, with a LocalBucket standing in for the bucket."""
+import os
+
+import pytest
+
+from analytics import storage
+from analytics.storage import BlobNotFound, LocalBucket, fetch_blob
+
+
+class UnreachableBucket:
+    name = 'bucket'
+
+    def get_blob(self, blob_name):
+        raise ConnectionError('network is down')
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    root = tmp_path / 'bucket'
+    root.mkdir()
+    (root / 'data.parquet').write_bytes(b'first')
+    return LocalBucket(str(root))
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    calls = []
+    download = storage._download
+
+    def counting_download(blob, path, chunk_size):
+        calls.append(blob.name)
+        download(blob, path, chunk_size)
+
+    monkeypatch.setattr(storage, '_download', counting_download)
+    return calls
+
+
+def test_cache_hit(bucket, downloads, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    path = fetch_blob(bucket, 'data.parquet', cache_dir)
+    assert fetch_blob(bucket, 'data.parquet', cache_dir) == path
+    assert downloads == ['data.parquet']
+    with open(path, 'rb') as f:
+        assert f.read() == b'first'
+
+
+def test_generation_change(bucket, downloads, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetch_blob(bucket, 'data.parquet', cache_dir)
+    blob_path = os.path.join(bucket.root, 'data.parquet')
+    with open(blob_path, 'wb') as f:
+        f.write(b'second')
+    stat = os.stat(blob_path)
+    os.utime(blob_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    path = fetch_blob(bucket, 'data.parquet', cache_dir)
+    assert downloads == ['data.parquet', 'data.parquet']
+    with open(path, 'rb') as f:
+        assert f.read() == b'second'
+
+
+def test_offline_fallback(bucket, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    path = fetch_blob(bucket, 'data.parquet', cache_dir)
+    # same bucket name, so the same cached copy
+    unreachable = UnreachableBucket()
+    unreachable.name = bucket.name
+    assert fetch_blob(unreachable, 'data.parquet', cache_dir) == path
+
+
+def test_offline_without_cache(tmp_path):
+    with pytest.raises(ConnectionError):
+        fetch_blob(UnreachableBucket(), 'data.parquet', str(tmp_path / 'cache'))
+
+
+def test_missing_blob_not_served_from_cache(bucket, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetch_blob(bucket, 'data.parquet', cache_dir)
+    os.remove(os.path.join(bucket.root, 'data.parquet'))
+    with pytest.raises(BlobNotFound):
+        fetch_blob(bucket, 'data.parquet', cache_dir)